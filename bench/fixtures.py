@@ -0,0 +1,230 @@
+import html
+import json
+import random
+from datetime import date, timedelta
+from aiohttp import web
+
+# Towns with real postcodes so benchmark shifts look like live ones
+TOWNS = [
+    ("Leeds", "LS1 4AP"), ("Manchester", "M1 1AE"), ("Teddington", "TW11 8DU"),
+    ("Bristol", "BS1 5TR"), ("York", "YO1 7HH"), ("Norwich", "NR2 1NH"),
+    ("Cardiff", "CF10 1EP"), ("Reading", "RG1 1DB"), ("Exeter", "EX1 1JG"),
+    ("Durham", "DH1 3NJ"), ("Bath", "BA1 1SU"), ("Chester", "CH1 2HU"),
+]
+COMPANIES = ["Specsavers", "Boots Opticians", "Vision Express", "Independent Practice", "Asda Opticians"]
+TIMES = [("09:00", "17:30"), ("08:30", "17:00"), ("10:00", "18:00"), ("09:00", "13:00")]
+
+def synthetic_shifts(count, seed=0):
+    """
+    `count` deterministic shifts spread over the next 90 days.
+    """
+    rng = random.Random(seed)
+    start = date(2026, 1, 1)
+    shifts = []
+    for i in range(count):
+        town, postcode = rng.choice(TOWNS)
+        begin, end = rng.choice(TIMES)
+        day_rate = rng.randrange(250, 420, 5)
+        shifts.append({
+            "id": 100000 + i,
+            "day": start + timedelta(days=rng.randrange(90)),
+            "start": begin,
+            "end": end,
+            "town": town,
+            "postcode": postcode,
+            "company": rng.choice(COMPANIES),
+            "rate": day_rate,
+        })
+    return shifts
+
+def _page(title, body, script=""):
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>{title}</title></head>"
+            f"<body>{body}{f'<script>{script}</script>' if script else ''}</body></html>")
+
+def _login_form(action, username, password, submit="Sign in"):
+    # GET form: submitting navigates to `action`, which no longer shows the form
+    return _page("Login", f"""
+        <form action="{action}" method="get">
+            {username}
+            {password}
+            <button type="submit">{submit}</button>
+        </form>""")
+
+EMPTY_MESSAGE = "<p class='empty-state'>No shifts available right now</p>"
+
+# --- LocateALocum: paginated server-rendered cards ---
+
+def locatealocum_card(shift):
+    day = shift["day"].strftime("%a %d %b %Y")
+    hourly = shift["rate"] / 8
+    return (f"<a class='jobCardLink' href='/jobs/{shift['id']}'>"
+            f"<img alt='{shift['company']} Logo'>"
+            f"<div class='cardDate'>{day}</div>"
+            f"<div class='cardTime'>{shift['start']} - {shift['end']}</div>"
+            f"<div class='cardLocation'>{shift['town']}</div>"
+            f"<div class='cardRateHr'>£{hourly:.2f}/hr</div>"
+            f"<div class='cardRateTotal'>Total: £{shift['rate']:.2f}</div>"
+            f"</a>")
+
+# --- Locumotive: Angular-style list filled from a search API, more on scroll ---
+
+LOCUMOTIVE_SCRIPT = """
+const list = document.getElementById('jobs');
+let page = 1, loading = false, done = false;
+const card = j => `<div class="job_${j.id} bg-white rounded-xl">
+  <span class="locum-date">${j.date}</span><span class="locum-time">${j.start_time} - ${j.end_time}</span>
+  <span class="locum-price">£${j.rate} /day</span>
+  <div class="address-area"><h2>${j.practice}</h2><h2>${j.city}</h2></div></div>`;
+async function load() {
+  if (loading || done) return;
+  loading = true;
+  const data = await (await fetch(`api/search?page=${page}`)).json();
+  if (!data.jobs.length) {
+    done = true;
+    if (page === 1) list.innerHTML = "<p class='empty-state'>No jobs found</p>";
+  }
+  list.insertAdjacentHTML('beforeend', data.jobs.map(card).join(''));
+  page++;
+  loading = false;
+}
+window.addEventListener('scroll', () => {
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 300) load();
+});
+load();
+"""
+
+def locumotive_job(shift):
+    return {
+        "id": shift["id"],
+        "date": shift["day"].strftime("%a %d %b %Y"),
+        "start_time": shift["start"],
+        "end_time": shift["end"],
+        "rate": shift["rate"],
+        "practice": shift["company"],
+        "city": shift["town"],
+    }
+
+# --- Team Locum: one bookings list ---
+
+def teamlocum_row(shift):
+    return (f"<li><h6>{shift['day'].strftime('%a %d %b %Y')}</h6>"
+            f"<p class='fw-semibold'><span class='badge'>{shift['start']} - {shift['end']}</span> "
+            f"<a href='#'>{shift['company']}, {shift['town']}</a>, £{shift['rate']} - DO</p></li>")
+
+# --- Locumbell: rows carried as JSON in data-row-data ---
+
+def locumbell_row(shift):
+    data = {
+        "id": shift["id"],
+        "branch_name": shift["company"],
+        "Shift Dates": shift["day"].strftime("%d/%m/%Y"),
+        "start_time": shift["start"],
+        "end_time": shift["end"],
+        "Rate": shift["rate"],
+        "city": shift["town"],
+        "postcode": shift["postcode"],
+    }
+    # Sized like the real site's icon: an empty span has no box, so Playwright never sees it as visible
+    return (f"<tr><td><span class='practice-icon' style='display:inline-block;width:16px;height:16px' "
+            f"data-row-data=\"{html.escape(json.dumps(data), quote=True)}\">&#128205;</span></td></tr>")
+
+class FixtureServer:
+    """
+    Local stand-in for the four agency sites, serving synthetic snapshots
+    of their login, listing and empty-state pages with `cards` shifts each:
+
+        /locatealocum/...   paginated cards (`page_size` per page)
+        /locumotive/...     search API + infinite scroll
+        /teamlocum/...      bookings list
+        /locumbell/...      data-row-data table
+
+        async with FixtureServer(cards=500) as server:
+            conf['base_url'] = server.base_url('locumotive')
+    """
+    def __init__(self, cards=100, page_size=50, host='127.0.0.1', port=0, seed=0):
+        self.shifts = synthetic_shifts(cards, seed)
+        self.page_size = page_size
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._runner = None
+
+    def base_url(self, agency):
+        return f"http://{self.host}:{self.port}/{agency}"
+
+    def _chunk(self, request):
+        page = max(1, int(request.query.get('page', 1)))
+        return self.shifts[(page - 1) * self.page_size:page * self.page_size]
+
+    @web.middleware
+    async def _count(self, request, handler):
+        self.requests += 1
+        return await handler(request)
+
+    def _app(self):
+        def page(text):
+            return web.Response(text=text, content_type='text/html')
+
+        async def locate_login(request):
+            return page(_login_form("/locatealocum/dashboard",
+                                    "<input name='email'>", "<input name='password' type='password'>"))
+
+        async def locate_search(request):
+            cards = self._chunk(request)
+            body = "".join(map(locatealocum_card, cards)) if cards else EMPTY_MESSAGE
+            return page(_page("Jobs", body))
+
+        async def locumotive_login(request):
+            return page(_login_form("/locumotive/dashboard",
+                                    "<input formcontrolname='email'>",
+                                    "<input formcontrolname='password' type='password'>"))
+
+        async def locumotive_search(request):
+            return page(_page("Advance search", "<div id='jobs'></div>", LOCUMOTIVE_SCRIPT))
+
+        async def locumotive_api(request):
+            return web.json_response({"jobs": [locumotive_job(s) for s in self._chunk(request)]})
+
+        async def teamlocum_login(request):
+            return page(_login_form("/teamlocum/bookings",
+                                    "<input type='email' name='username'>", "<input type='password'>"))
+
+        async def teamlocum_bookings(request):
+            rows = "".join(map(teamlocum_row, self.shifts))
+            return page(_page("Bookings", f"<ul>{rows}</ul>" if rows else EMPTY_MESSAGE))
+
+        async def locumbell_login(request):
+            return page(_login_form("/locumbell/index.html", "<input id='username'>",
+                                    "<input id='password' type='password'>", submit="Log in"))
+
+        async def locumbell_index(request):
+            rows = "".join(map(locumbell_row, self.shifts))
+            return page(_page("Available Shifts", f"<table>{rows}</table>" if rows else EMPTY_MESSAGE))
+
+        async def dashboard(request):
+            return page(_page("Dashboard", "<h1>Dashboard</h1>"))
+
+        app = web.Application(middlewares=[self._count])
+        app.router.add_get('/locatealocum/login', locate_login)
+        app.router.add_get('/locatealocum/dashboard', dashboard)
+        app.router.add_get('/locatealocum/jobs/search', locate_search)
+        app.router.add_get('/locumotive/login', locumotive_login)
+        app.router.add_get('/locumotive/dashboard', dashboard)
+        app.router.add_get('/locumotive/advance-search', locumotive_search)
+        app.router.add_get('/locumotive/api/search', locumotive_api)
+        app.router.add_get('/teamlocum/login', teamlocum_login)
+        app.router.add_get('/teamlocum/bookings', teamlocum_bookings)
+        app.router.add_get('/locumbell/login', locumbell_login)
+        app.router.add_get('/locumbell/index.html', locumbell_index)
+        return app
+
+    async def __aenter__(self):
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # Port 0 picks a free port; read back the one actually bound
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._runner.cleanup()
@@ -0,0 +1,181 @@
+"""
+Offline scraper benchmark.
+
+Runs every scraper class end to end against the local FixtureServer
+(no agency logins, no network) for a range of synthetic listing sizes and
+reports wall time percentiles, throughput, per-stage latencies from the
+run metrics, and memory.
+
+    python -m bench.run
+    python -m bench.run --cards 10 1000 --repeat 5 --agencies locumotive
+    python -m bench.run --fast-path        # LocateALocum listing over HTTP
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import yaml
+from bench.fixtures import FixtureServer
+from core.browser import BrowserManager
+from core.metrics import Metrics, peak_rss_bytes
+from core.sessions import SessionStore
+from scrapers.locatealocum import LocateALocumScraper
+from scrapers.locumbell import LocumbellScraper
+from scrapers.locumotive import LocumotiveScraper
+from scrapers.teamlocum import TeamLocumScraper
+
+# agencies.yaml key -> (scraper class, fixture site)
+AGENCIES = {
+    "locatealocum": (LocateALocumScraper, "locatealocum"),
+    "locumbell_standard": (LocumbellScraper, "locumbell"),
+    "locumotive": (LocumotiveScraper, "locumotive"),
+    "teamlocum": (TeamLocumScraper, "teamlocum"),
+}
+
+BENCH_SECRETS = {
+    "LOCATE_USER": "bench", "LOCATE_PASS": "bench",
+    "LOCUMB_USER": "bench", "LOCUMB_PASS": "bench",
+    "LOCUMOTIVE_USER": "bench", "LOCUMOTIVE_PASS": "bench",
+    "TEAMLOCUM_USER": "bench", "TEAMLOCUM_PASS": "bench",
+}
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile; fine for the handful of repeats a benchmark has.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def bench_config(key, agency_conf, server, site, fast_path=False):
+    conf = copy.deepcopy(agency_conf)
+    conf['base_url'] = server.base_url(site)
+    conf['login_url'] = server.base_url(site) + "/login"
+    # Short scroll settle: the fixture answers in milliseconds
+    if (conf.get('pagination') or {}).get('mode') == 'scroll':
+        conf['pagination']['scroll_wait'] = 500
+    if conf.get('http_fast_path'):
+        conf['http_fast_path']['enabled'] = fast_path
+    # The fixture Locumbell has no API, only the data-row-data table
+    if key.startswith('locumbell'):
+        conf['api_patterns'] = []
+    return conf
+
+async def run_once(key, agency_conf, server, browser_manager, fast_path=False, trace_memory=False):
+    scraper_class, site = AGENCIES[key]
+    secrets = dict(BENCH_SECRETS, AGENCY_NAME=agency_conf.get('name'))
+    conf = bench_config(key, agency_conf, server, site, fast_path)
+    secrets['LOGIN_URL'] = conf['login_url']
+
+    # Fresh metrics per run, so the spans below belong to this run only
+    metrics = Metrics.reset()
+    with tempfile.TemporaryDirectory() as sessions:
+        scraper = scraper_class(secrets, browser_manager, session_store=SessionStore(sessions, secret=''), config=conf)
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        shifts = await scraper.run()
+        elapsed = time.perf_counter() - started
+        python_peak = None
+        if trace_memory:
+            _, python_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    spans = {}
+    for span in metrics.spans:
+        spans.setdefault(span.name, []).append(span.seconds)
+    return {
+        "seconds": elapsed,
+        "shifts": len(shifts),
+        "failed": scraper.failed,
+        "python_peak_bytes": python_peak,
+        "spans": spans,
+    }
+
+def summarise(key, cards, runs):
+    seconds = [r["seconds"] for r in runs]
+    stage = {}
+    for name in ("navigate", "wait", "extract"):
+        values = [s for r in runs for s in r["spans"].get(name, [])]
+        if values:
+            stage[name] = {"p50_ms": percentile(values, 50) * 1000, "p95_ms": percentile(values, 95) * 1000}
+    median = statistics.median(seconds)
+    peaks = [r["python_peak_bytes"] for r in runs if r["python_peak_bytes"] is not None]
+    return {
+        "agency": key,
+        "cards": cards,
+        "runs": len(runs),
+        "complete": all(r["shifts"] == cards and not r["failed"] for r in runs),
+        "shifts": runs[-1]["shifts"],
+        "p50_s": median,
+        "p95_s": percentile(seconds, 95),
+        "max_s": max(seconds),
+        "cards_per_s": cards / median if cards and median else 0.0,
+        "stages": stage,
+        "python_peak_mb": max(peaks) / 1e6 if peaks else None,
+        "rss_peak_mb": (peak_rss_bytes() or 0) / 1e6,
+    }
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+def print_table(results):
+    print(f"\n{'agency':<20}{'cards':>7}{'ok':>4}{'p50 s':>9}{'p95 s':>9}{'cards/s':>10}"
+          f"{'extract p95 ms':>16}{'py peak MB':>12}{'rss MB':>9}")
+    for r in results:
+        extract = r["stages"].get("extract", {}).get("p95_ms")
+        print(f"{r['agency']:<20}{r['cards']:>7}{'yes' if r['complete'] else 'NO':>4}"
+              f"{r['p50_s']:>9.2f}{r['p95_s']:>9.2f}{r['cards_per_s']:>10.0f}"
+              f"{_fmt(extract, '.1f'):>16}{_fmt(r['python_peak_mb'], '.1f'):>12}{r['rss_peak_mb']:>9.0f}")
+
+async def main(args):
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+    keys = args.agencies or list(AGENCIES)
+
+    browser_manager = BrowserManager()
+    results = []
+    try:
+        for cards in args.cards:
+            async with FixtureServer(cards=cards, page_size=args.page_size) as server:
+                for key in keys:
+                    runs = []
+                    for _ in range(args.repeat):
+                        runs.append(await run_once(key, config['agencies'][key], server, browser_manager,
+                                                   args.fast_path, args.trace_memory))
+                    results.append(summarise(key, cards, runs))
+                    print(f"{key}: {cards} cards, p50 {results[-1]['p50_s']:.2f}s "
+                          f"({'complete' if results[-1]['complete'] else 'INCOMPLETE'})")
+    finally:
+        await browser_manager.close()
+
+    print_table(results)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"args": vars(args), "results": results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark against local fixture pages")
+    parser.add_argument("--cards", type=int, nargs="+", default=[0, 10, 100, 1000, 5000],
+                        help="listing sizes to run (0 exercises the empty-state pages)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per agency and size")
+    parser.add_argument("--agencies", nargs="+", choices=list(AGENCIES), help="default: all")
+    parser.add_argument("--page-size", type=int, default=50, help="cards per fixture page / API page")
+    parser.add_argument("--fast-path", action="store_true", help="enable http_fast_path where configured")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report peak Python allocations per run (tracemalloc; slows the runs down)")
+    parser.add_argument("--config", default="config/agencies.yaml")
+    parser.add_argument("--output", default="bench/results.json")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
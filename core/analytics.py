@@ -0,0 +1,187 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+import pandas as pd
+from core.geoutils import geohash_bounds, geohash_encode
+from core.parsing import parse_amount, parse_date
+
+# Hours assumed for an hourly rate on a shift whose times couldn't be parsed
+STANDARD_DAY_HOURS = 8.0
+
+FACT_COLUMNS = ["id", "agency", "day", "region", "lat", "lon", "rate_value", "rate_unit", "hours", "total"]
+GROUPINGS = {"region_week": ["region", "week"], "agency_week": ["agency", "week"]}
+
+def day_rates(facts):
+    """
+    Comparable pay per shift, vectorised: hourly rates (LocateALocum
+    "£38.00/hr") times the shift's hours, daily rates as listed, and the
+    shift total where no rate was parsed.
+    """
+    hours = facts["hours"].fillna(STANDARD_DAY_HOURS)
+    rate = facts["rate_value"].where(facts["rate_value"] > 0)
+    by_unit = rate.where(facts["rate_unit"] != "hour", rate * hours)
+    return by_unit.where(facts["rate_unit"].isin(["hour", "day"])).fillna(facts["total"])
+
+def iso_weeks(days):
+    """
+    "2026-W09" style ISO weeks; undated shifts get no week.
+    """
+    iso = days.dt.isocalendar()
+    weeks = iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2)
+    return weeks.where(days.notna())
+
+def _aggregate(facts, keys):
+    grouped = facts.dropna(subset=["day_rate"]).groupby(keys)["day_rate"]
+    return pd.DataFrame({
+        "median": grouped.median(),
+        "p90": grouped.quantile(0.9),
+        "volume": grouped.size(),
+    }).round(2).reset_index()
+
+class RateAnalytics:
+    """
+    Day-rate statistics per region (geohash-4 cell, ~39 x 20 km) per ISO
+    week and per agency per ISO week: median, p90 and volume.
+
+    Every stored shift contributes one fact row (data/analytics/facts.csv,
+    sorted by id so a run's changes diff line by line).
+    Each run only hands over the shifts it wrote (add()), and commit()
+    recomputes just the groups those shifts fall in; everything else is
+    kept from the saved aggregates. The first run seeds the facts from the
+    whole history.
+    """
+    def __init__(self, directory='data/analytics', precision=4):
+        self.directory = directory
+        self.precision = precision
+        self._delta = {}
+        self.facts = self._read("facts.csv", FACT_COLUMNS + ["day_rate", "week"])
+        self.seeded = os.path.exists(os.path.join(directory, "facts.csv"))
+        self.aggregates = {name: self._read(f"{name}.csv", keys + ["median", "p90", "volume"])
+                           for name, keys in GROUPINGS.items()}
+
+    def _read(self, name, columns):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=columns)
+        frame = pd.read_csv(path, dtype={"id": str, "region": str, "week": str}, float_precision="round_trip")
+        if "day" in frame:
+            frame["day"] = pd.to_datetime(frame["day"])
+        return frame
+
+    def fact(self, record):
+        lat, lon = record.get("lat"), record.get("lon")
+        day = record.get("day") or parse_date(record.get("date"))
+        return {
+            "id": record.get("id"),
+            "agency": record.get("agency"),
+            "day": str(day) if day else None,
+            "region": geohash_encode(lat, lon, self.precision) if lat is not None and lon is not None else None,
+            "lat": lat,
+            "lon": lon,
+            "rate_value": record.get("rate_value"),
+            "rate_unit": record.get("rate_unit"),
+            "hours": record.get("hours"),
+            "total": parse_amount(record.get("total")),
+        }
+
+    def add(self, records):
+        """
+        Queues new or changed stored shifts (records with their history id).
+        """
+        for record in records:
+            if record.get("id"):
+                self._delta[record["id"]] = self.fact(record)
+
+    def commit(self, store=None):
+        """
+        Folds the queued shifts into the facts and recomputes the affected
+        groups. `store` seeds the facts from the full history the first time.
+        Returns how many groups were recomputed.
+        """
+        if not self.seeded and store is not None:
+            self.add(store.all_shifts())
+            self.seeded = True
+        if not self._delta:
+            return 0
+
+        delta = pd.DataFrame(list(self._delta.values()), columns=FACT_COLUMNS)
+        self._delta = {}
+        delta["day"] = pd.to_datetime(delta["day"])
+        delta = self._derive(delta)
+
+        # Groups touched by the delta: where its shifts are now, and where changed ones used to be
+        previous = self.facts[self.facts["id"].isin(delta["id"])]
+        kept = self.facts[~self.facts["id"].isin(delta["id"])]
+        self.facts = pd.concat([kept, delta], ignore_index=True) if len(kept) else delta
+
+        recomputed = 0
+        for name, keys in GROUPINGS.items():
+            touched = pd.concat([previous[keys], delta[keys]]).dropna().drop_duplicates()
+            affected = pd.MultiIndex.from_frame(touched)
+            facts = self.facts[pd.MultiIndex.from_frame(self.facts[keys]).isin(affected)]
+            kept = self.aggregates[name]
+            kept = kept[~pd.MultiIndex.from_frame(kept[keys]).isin(affected)] if len(kept) else kept
+            fresh = _aggregate(facts, keys)
+            merged = pd.concat([kept, fresh], ignore_index=True) if len(kept) else fresh
+            self.aggregates[name] = merged.sort_values(keys, ignore_index=True)
+            recomputed += len(touched)
+        return recomputed
+
+    def _derive(self, facts):
+        facts = facts.astype({"rate_value": float, "hours": float, "total": float, "lat": float, "lon": float})
+        facts["day_rate"] = day_rates(facts).round(2)
+        facts["week"] = iso_weeks(facts["day"])
+        return facts
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        facts = self.facts.assign(day=pd.to_datetime(self.facts["day"]).dt.strftime("%Y-%m-%d"))
+        self._write_csv("facts.csv", facts.sort_values("id", ignore_index=True))
+        for name, frame in self.aggregates.items():
+            self._write_csv(f"{name}.csv", frame)
+
+    def _write_csv(self, name, frame):
+        path = os.path.join(self.directory, name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.analytics-', suffix='.tmp')
+        os.close(fd)
+        frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def heatmap(self, weeks=4):
+        """
+        Per region over the latest `weeks` ISO weeks with data: cell bounds,
+        median / p90 day rate and volume. Small enough for the map to fetch.
+        """
+        facts = self.facts.dropna(subset=["region"])
+        window = sorted(facts["week"].dropna().unique())[-weeks:]
+        stats = _aggregate(facts[facts["week"].isin(window)], ["region"])
+        cells = []
+        for row in stats.itertuples(index=False):
+            min_lat, min_lon, max_lat, max_lon = geohash_bounds(row.region)
+            cells.append([row.region, round(min_lat, 4), round(min_lon, 4), round(max_lat, 4), round(max_lon, 4),
+                          float(row.median), float(row.p90), int(row.volume)])
+        updated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        return {"updated": updated, "weeks": list(window), "cells": cells}
+
+    def export_heatmap(self, path, weeks=4):
+        """
+        Writes heatmap() to `path`, unless the file already holds the same
+        cells. Returns True if it was written.
+        """
+        data = self.heatmap(weeks)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            if previous.get("weeks") == data["weeks"] and previous.get("cells") == data["cells"]:
+                return False
+        except (OSError, ValueError):
+            pass
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.heatmap-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        # Served next to the map shards, so readable like them rather than mkstemp's 0600
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return True
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from playwright.async_api import async_playwright
+from core.metrics import Metrics
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Hide the webdriver property to evade simple bot detection
+STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+CONTEXT_OPTIONS = {
+    "user_agent": USER_AGENT,
+    "viewport": {'width': 1920, 'height': 1080},
+    "locale": 'en-GB',
+    "timezone_id": 'Europe/London'
+}
+
+class BrowserManager:
+    """
+    Launches a single headless Chromium for the whole run and hands out
+    isolated browser contexts (cookies, storage, cache) to each scraper.
+    """
+    def __init__(self, headless=True):
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self._lock = asyncio.Lock()
+        self.launch_time = None
+        self.context_times = {}
+
+    async def start(self):
+        # Several scrapers may ask for a context at once; only the first launches.
+        async with self._lock:
+            if self.browser is not None:
+                return self.browser
+
+            started = time.monotonic()
+            with Metrics.shared().span("browser_launch"):
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=self.headless)
+            self.launch_time = time.monotonic() - started
+            print(f"Browser launched in {self.launch_time:.2f}s")
+            return self.browser
+
+    async def new_context(self, name, **options):
+        """
+        Returns a fresh context with the shared stealth settings.
+        Extra keyword arguments are passed straight to Playwright's new_context.
+        """
+        browser = await self.start()
+
+        started = time.monotonic()
+        with Metrics.shared().span("browser_context", agency=name):
+            context = await browser.new_context(**{**CONTEXT_OPTIONS, **options})
+            await context.add_init_script(STEALTH_SCRIPT)
+        self.context_times[name] = time.monotonic() - started
+        return context
+
+    async def close(self):
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+        if self.launch_time is not None:
+            print(f"Browser timings: launch {self.launch_time:.2f}s, "
+                  f"{len(self.context_times)} contexts")
+            for name, elapsed in self.context_times.items():
+                print(f"   - {name}: context ready in {elapsed:.3f}s")
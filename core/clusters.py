@@ -0,0 +1,56 @@
+import statistics
+from core.geoutils import geohash_encode
+
+# (geohash precision, highest map zoom it is shown at). Precision 2 cells are
+# ~1250 km wide, 6 about 1.2 km; past the last level the page shows locations.
+CLUSTER_LEVELS = [(2, 4), (3, 6), (4, 8), (5, 10), (6, 11)]
+DETAIL_ZOOM = 12
+
+def cluster_pyramid(locations, levels=CLUSTER_LEVELS, agencies=None):
+    """
+    Aggregates grouped map locations (see MapGenerator.group_by_location)
+    into geohash cells for every level:
+
+        {"<precision>": [[geohash, lat, lon, shifts, locations, min, max, median], ...]}
+
+    lat/lon is the shift-weighted centre of the cell's locations and
+    min/max/median are over shift totals. With `agencies` (the agency names
+    in display order) every row gets a last column listing the indexes of
+    the agencies offering shifts in that cell.
+    """
+    index = {name: i for i, name in enumerate(agencies or [])}
+    pyramid = {}
+    for precision, _ in levels:
+        cells = {}
+        for loc in locations:
+            key = geohash_encode(loc["lat"], loc["lon"], precision)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = {"lat": 0.0, "lon": 0.0, "locations": 0, "totals": [], "agencies": set()}
+            cell["lat"] += loc["lat"] * loc["count"]
+            cell["lon"] += loc["lon"] * loc["count"]
+            cell["locations"] += 1
+            cell["totals"].extend(s["total"] for s in loc["shifts"])
+            if agencies is not None:
+                cell["agencies"].update(index[name] for name in loc["agencies"] if name in index)
+
+        rows = []
+        for key in sorted(cells):
+            cell = cells[key]
+            totals = cell["totals"]
+            n = len(totals)
+            row = [
+                key,
+                round(cell["lat"] / n, 5),
+                round(cell["lon"] / n, 5),
+                n,
+                cell["locations"],
+                round(min(totals), 2),
+                round(max(totals), 2),
+                round(statistics.median(totals), 2),
+            ]
+            if agencies is not None:
+                row.append(sorted(cell["agencies"]))
+            rows.append(row)
+        pyramid[str(precision)] = rows
+    return pyramid
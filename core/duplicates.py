@@ -0,0 +1,185 @@
+import re
+from difflib import SequenceMatcher
+from core.geoutils import geohash_cell_size, geohash_encode, haversine_km
+from core.parsing import parse_amount, parse_date
+
+# Company names agencies use when the practice is hidden; they never rule a match out
+GENERIC_COMPANIES = re.compile(r"^(unknown|locum|team locum|independent)|agency|client|optometrist", re.I)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _tokens(text):
+    return set(_WORD.findall((text or "").lower()))
+
+def _minutes(hhmm):
+    if not hhmm:
+        return None
+    hours, _, minutes = hhmm.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+class DuplicateLinker:
+    """
+    Finds the same shift listed by several agencies and links the listings
+    into one canonical shift.
+
+    Shifts are blocked by (day, geohash cell) so only listings on the same
+    day within neighbouring cells are ever compared. A candidate pair from
+    two agencies matches when the practices are within `max_km`, the start
+    times agree within `max_start_diff` minutes, the company names don't
+    contradict each other and the location names look alike (or the points
+    are within `same_place_km`). Matches are merged best first, and a group
+    never holds two listings from the same agency.
+    """
+    def __init__(self, precision=4, max_km=15.0, same_place_km=1.0, max_start_diff=30, min_name_score=0.5):
+        # Precision 4 cells (~39 x 20 km) plus their neighbours cover max_km comfortably
+        self.precision = precision
+        self.max_km = max_km
+        self.same_place_km = same_place_km
+        self.max_start_diff = max_start_diff
+        self.min_name_score = min_name_score
+
+    def _blocks(self, shifts):
+        blocks = {}
+        for i, shift in enumerate(shifts):
+            key = (shift["_day"], geohash_encode(shift["lat"], shift["lon"], self.precision))
+            blocks.setdefault(key, []).append(i)
+        return blocks
+
+    def _neighbours(self, lat, lon):
+        dlat, dlon = geohash_cell_size(self.precision)
+        return {geohash_encode(lat + y * dlat, lon + x * dlon, self.precision) for y in (-1, 0, 1) for x in (-1, 0, 1)}
+
+    @staticmethod
+    def name_score(a, b):
+        """
+        Similarity of two location strings. "Stockton Heath, Warrington" and
+        "Warrington" score 1.0: every word of the shorter one is in the other.
+        """
+        ta, tb = _tokens(a), _tokens(b)
+        if not ta or not tb:
+            return 0.0
+        containment = len(ta & tb) / min(len(ta), len(tb))
+        if containment == 1.0:
+            return containment
+        # Character-level similarity catches spelling variants ("St Helens" / "St. Helen's")
+        return max(containment, SequenceMatcher(None, (a or "").lower(), (b or "").lower()).ratio())
+
+    @staticmethod
+    def companies_conflict(a, b):
+        if not a or not b or GENERIC_COMPANIES.search(a) or GENERIC_COMPANIES.search(b):
+            return False
+        ta, tb = _tokens(a), _tokens(b)
+        return not (ta <= tb or tb <= ta)
+
+    def score(self, a, b):
+        """
+        Match score for two listings from different agencies, or None.
+        """
+        distance = haversine_km(a["lat"], a["lon"], b["lat"], b["lon"])
+        if distance > self.max_km:
+            return None
+        start_a, start_b = _minutes(a.get("start")), _minutes(b.get("start"))
+        if start_a is not None and start_b is not None and abs(start_a - start_b) > self.max_start_diff:
+            return None
+        if self.companies_conflict(a.get("company"), b.get("company")):
+            return None
+        names = self.name_score(a.get("location"), b.get("location"))
+        if names < self.min_name_score and distance > self.same_place_km:
+            return None
+        return names + (1 - distance / self.max_km)
+
+    def link(self, records):
+        """
+        Returns the canonical shifts for `records` (stored shift dicts).
+        Listings without coordinates or a date can't be compared and come
+        back as shifts of their own. Each canonical shift is a copy of its
+        most complete listing with:
+          offers     every listing's agency, id, rate, total, link and company, best paid first
+          agencies   the agencies offering it
+          total      the best total on offer
+        """
+        comparable, alone = [], []
+        for record in records:
+            day = record.get("day") or parse_date(record.get("date"))
+            if record.get("lat") is None or record.get("lon") is None or not day:
+                alone.append(record)
+            else:
+                comparable.append(dict(record, _day=str(day)))
+
+        blocks = self._blocks(comparable)
+        neighbours = {}
+        pairs = []
+        for (day, cell), members in blocks.items():
+            if cell not in neighbours:
+                first = comparable[members[0]]
+                neighbours[cell] = self._neighbours(first["lat"], first["lon"])
+            for i in members:
+                a = comparable[i]
+                for neighbour in neighbours[cell]:
+                    for j in blocks.get((day, neighbour), ()):
+                        # Each unordered pair once; listings from one agency are never duplicates
+                        if j <= i or comparable[j].get("agency") == a.get("agency"):
+                            continue
+                        score = self.score(a, comparable[j])
+                        if score is not None:
+                            pairs.append((score, i, j))
+
+        # Union-find, best matches first, at most one listing per agency in a group
+        parent = list(range(len(comparable)))
+        agencies = [{s.get("agency")} for s in comparable]
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for _, i, j in sorted(pairs, reverse=True):
+            ri, rj = root(i), root(j)
+            if ri == rj or agencies[ri] & agencies[rj]:
+                continue
+            parent[rj] = ri
+            agencies[ri] |= agencies[rj]
+
+        groups = {}
+        for i in range(len(comparable)):
+            groups.setdefault(root(i), []).append(comparable[i])
+
+        canonical = [self.canonical(group) for group in groups.values()]
+        canonical.extend(self.canonical([record]) for record in alone)
+        return canonical
+
+    @staticmethod
+    def canonical(group):
+        # The most specific listing: with a postcode, then the longest location name
+        best = max(group, key=lambda s: (bool(s.get("postcode")), len(s.get("location") or ""), s.get("id") or ""))
+        offers = sorted((
+            {
+                "agency": s.get("agency"),
+                "id": s.get("id"),
+                "company": s.get("company"),
+                "rate": s.get("rate"),
+                "total": parse_amount(s.get("total")),
+                "link": s.get("link"),
+            }
+            for s in group
+        ), key=lambda o: (-(o["total"] or 0), o["agency"] or ""))
+        shift = {k: v for k, v in best.items() if k != "_day"}
+        # Some agencies hide the practice; take the name from one that shows it
+        named = [s.get("company") for s in group if s.get("company") and not GENERIC_COMPANIES.search(s["company"])]
+        if named:
+            shift["company"] = named[0]
+        shift.update(
+            # Stable across runs as long as the same listings are linked
+            id=min(s.get("id") or "" for s in group),
+            offers=offers,
+            agencies=sorted({o["agency"] for o in offers if o["agency"]}),
+            total=offers[0]["total"] if offers[0]["total"] is not None else best.get("total"),
+        )
+        return shift
+
+def link_duplicates(records, **options):
+    """
+    Canonical shifts for a list of stored shifts (see DuplicateLinker).
+    """
+    return DuplicateLinker(**options).link(records)
@@ -0,0 +1,150 @@
+import difflib
+import re
+from core.geoutils import haversine_km
+
+# Spellings that differ between agency listings and the GeoNames data
+REPLACEMENTS = [
+    (re.compile(r"\bSAINT\b"), "ST"),
+    (re.compile(r"\bST\.\s*"), "ST "),
+    (re.compile(r"&"), " AND "),
+]
+
+# How close (km) an "area" has to be to its "town" to be trusted
+AREA_RADIUS_KM = 30
+
+def normalize_place(text):
+    """
+    Upper-cases and strips punctuation so "St. Helens", "Saint Helens" and
+    "ST HELENS" share one key.
+    """
+    text = text.upper()
+    for pattern, replacement in REPLACEMENTS:
+        text = pattern.sub(replacement, text)
+    text = re.sub(r"[^A-Z0-9 ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+class Gazetteer:
+    """
+    Offline UK place-name lookup built from the GeoNames GB data that
+    pgeocode already downloads (one row per postcode district).
+
+    Each place name maps to one entry per county it appears in, with the
+    centroid of its postcode districts. County names are indexed too, as a
+    coarse fallback ("Derbyshire"). Lookups are dict hits; fuzzy matching
+    only looks at names that share a prefix or a word with the query.
+    """
+    def __init__(self, places):
+        # name -> [{"lat", "lon", "county", "weight"}], heaviest first
+        self.places = places
+        self.prefix_index = {}
+        self.token_index = {}
+        for name in places:
+            self.prefix_index.setdefault(name[:3], set()).add(name)
+            for token in name.split():
+                self.token_index.setdefault(token, set()).add(name)
+
+    @classmethod
+    def from_dataframe(cls, data):
+        groups = {}
+
+        def add(name, county, lat, lon):
+            key = normalize_place(str(name))
+            if not key:
+                return
+            entry = groups.setdefault((key, county), [0.0, 0.0, 0])
+            entry[0] += lat
+            entry[1] += lon
+            entry[2] += 1
+
+        rows = data[['place_name', 'county_name', 'latitude', 'longitude']].dropna(subset=['latitude', 'longitude'])
+        for place, county, lat, lon in rows.itertuples(index=False):
+            county = county if isinstance(county, str) else ''
+            if isinstance(place, str):
+                add(place, county, lat, lon)
+            if county:
+                add(county, county, lat, lon)
+
+        places = {}
+        for (key, county), (lat_sum, lon_sum, n) in groups.items():
+            places.setdefault(key, []).append({
+                "lat": round(lat_sum / n, 6),
+                "lon": round(lon_sum / n, 6),
+                "county": county,
+                "weight": n
+            })
+        for entries in places.values():
+            entries.sort(key=lambda e: -e["weight"])
+        return cls(places)
+
+    @classmethod
+    def from_pgeocode(cls, nomi):
+        return cls.from_dataframe(nomi._data)
+
+    def __len__(self):
+        return len(self.places)
+
+    def candidates(self, text):
+        """
+        Entries for a single place name: exact match first, then fuzzy.
+        """
+        key = normalize_place(text)
+        if not key:
+            return []
+        if key in self.places:
+            return self.places[key]
+
+        pool = set(self.prefix_index.get(key[:3], ()))
+        for token in key.split():
+            pool |= self.token_index.get(token, set())
+        match = difflib.get_close_matches(key, pool, n=1, cutoff=0.85)
+        return self.places[match[0]] if match else []
+
+    def lookup(self, text):
+        """
+        Returns (lat, lon) or None.
+
+        "Area, Town" strings are resolved right to left: the last part that
+        resolves is the anchor, and a more specific part wins only if one of
+        its candidates lies within AREA_RADIUS_KM of the anchor. That keeps
+        "Stockton Heath, Warrington" from landing on a Stockton elsewhere.
+        """
+        if not text:
+            return None
+
+        whole = self.candidates(text)
+        parts = [p for p in (s.strip() for s in text.split(',')) if p]
+        if whole and len(parts) < 2:
+            return self._point(whole[0])
+
+        anchor = None
+        for part in reversed(parts):
+            found = self.candidates(part)
+            if found:
+                anchor = found[0]
+                break
+
+        if anchor is None:
+            return self._point(whole[0]) if whole else self._words(text)
+
+        for part in parts:
+            for entry in self.candidates(part):
+                if entry is anchor:
+                    return self._point(anchor)
+                if haversine_km(entry["lat"], entry["lon"], anchor["lat"], anchor["lon"]) <= AREA_RADIUS_KM:
+                    return self._point(entry)
+
+        return self._point(anchor)
+
+    def _words(self, text):
+        # Last resort for strings like "BOL Franchise Teddington": longest run of words that is a place
+        words = normalize_place(text).split()
+        for size in range(len(words), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                found = self.places.get(" ".join(words[start:start + size]))
+                if found:
+                    return self._point(found[0])
+        return None
+
+    @staticmethod
+    def _point(entry):
+        return (entry["lat"], entry["lon"])
@@ -1,25 +1,93 @@
+import gzip
+import hashlib
 import json
 import os
-from datetime import datetime
+import re
+import tempfile
+from datetime import datetime, timezone
+from core.clusters import CLUSTER_LEVELS, DETAIL_ZOOM, cluster_pyramid
+from core.duplicates import link_duplicates
+from core.metrics import Metrics
+from core.parsing import parse_amount
+from core.storage import open_store
+
+try:
+    import brotli
+except ImportError:
+    # Optional: .br shards are only written when the brotli package is installed
+    brotli = None
+
+MANIFEST_PLACEHOLDER = 'const manifestUrl = "map/manifest.json"; // WILL BE REPLACED BY PYTHON'
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", (text or "unknown").lower()).strip("-") or "unknown"
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.map-', suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    # mkstemp creates 0600 files; the web server has to be able to read them
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
 
 class MapGenerator:
-    def __init__(self, data_file='data/history.json', template_file='templates/index.html', output_file='output/index.html'):
+    """
+    Builds the map page and the data it fetches:
+
+        <data_dir>/manifest.json                  content hash, update time, zoom levels, one entry per shard
+        <data_dir>/overview.<hash>.json           cluster pyramid over every agency (core.clusters)
+        <data_dir>/<agency>.<hash>.json(.gz/.br)  that agency's pyramid and shifts grouped by location, minified
+
+    Shard names change only when their content does, so browsers and CDNs can
+    cache them forever, and the page downloads only the agencies it shows.
+    A shift listed by several agencies (core.duplicates) appears once, in the
+    shard of every agency offering it.
+    When the hash of the grouped data matches the manifest nothing is written,
+    so a run with no new shifts leaves the published files untouched.
+    """
+    def __init__(self, data_file='data/history.db', template_file='templates/index.html', output_file='output/index.html',
+                 store=None, data_dir=None, data_url=None, precompress=True, dedupe=True):
         self.data_file = data_file
+        # An already open history store (see core.storage); otherwise data_file is opened
+        self.store = store
         self.template_file = template_file
         self.output_file = output_file
+        # Shards and manifest sit beside the page unless configured otherwise
+        self.data_dir = data_dir or os.path.join(os.path.dirname(output_file), 'map')
+        # Where the page fetches the manifest from; defaults to the data_dir relative to the page
+        self.data_url = data_url or os.path.relpath(os.path.join(self.data_dir, 'manifest.json'),
+                                                    os.path.dirname(output_file) or '.').replace(os.sep, '/')
+        self.precompress = precompress
+        # Link the same shift listed by several agencies so it is counted and drawn once
+        self.dedupe = dedupe
 
     def generate(self):
-        # 1. Load Data
+        with Metrics.shared().span("map_generate") as span:
+            self._generate(span)
+
+    def _load_shifts(self):
+        # Currently listed shifts from the history store, or a plain JSON array
+        if self.store is not None:
+            return self.store.active_shifts()
+        if self.data_file.endswith(('.db', '.jsonl')):
+            store = open_store(self.data_file)
+            shifts = store.active_shifts()
+            store.close()
+            return shifts
         if not os.path.exists(self.data_file):
             print("No data file found, generating empty map.")
-            shifts = []
-        else:
-            with open(self.data_file, 'r') as f:
-                shifts = json.load(f)
+            return []
+        with open(self.data_file, 'r') as f:
+            return json.load(f)
 
-        # 2. Group Data by Location
+    @staticmethod
+    def group_by_location(shifts):
+        """
+        Shifts with coordinates grouped per (location, lat, lon), in a stable
+        order so that the same shifts always serialise to the same bytes.
+        """
         grouped_data = {}
-        
+
         for shift in shifts:
             # Skip invalid coordinates
             if shift.get('lat') is None or shift.get('lon') is None:
@@ -37,55 +105,157 @@ class MapGenerator:
                     "lon": lon,
                     "shifts": [],
                     "count": 0,
-                    "companies": set()
+                    "companies": set(),
+                    "agencies": set()
                 }
-            
-            # Process shift for inner list
-            # Ensure total is a float
-            try:
-                total_val = float(str(shift.get('total', 0)).replace(',', ''))
-            except (ValueError, TypeError):
-                total_val = 0.0
-
-            grouped_data[key]["shifts"].append({
+
+            # Totals are stored numeric; records from before typed shifts still hold text
+            total_val = parse_amount(shift.get('total')) or 0.0
+
+            entry = {
                 "location": loc_name,
                 "total": total_val,
                 "company": shift.get('company', 'Unknown Agency')
-            })
+            }
+            agencies = shift.get('agencies') or [shift.get('agency') or 'Unknown']
+            if len(agencies) > 1:
+                # Listed by several agencies: the page shows who offers it and counts it once
+                entry.update(id=shift.get('id'), agencies=agencies)
+            grouped_data[key]["shifts"].append(entry)
             grouped_data[key]["count"] += 1
             grouped_data[key]["companies"].add(shift.get('company', 'Unknown Agency'))
+            grouped_data[key]["agencies"].update(agencies)
 
         # Convert to list for JSON and handle sets
         locations_list = []
-        for key, data in grouped_data.items():
-            data["companies"] = list(data["companies"]) # Convert set to list
+        for key in sorted(grouped_data, key=lambda k: (str(k[0]), k[1], k[2])):
+            data = grouped_data[key]
+            data["companies"] = sorted(data["companies"])
+            data["agencies"] = sorted(data["agencies"])
+            data["shifts"].sort(key=lambda s: (s["total"], str(s["company"])))
             locations_list.append(data)
+        return locations_list
 
-        # 3. Read Template
-        if not os.path.exists(self.template_file):
-             print(f"Template file missing at {self.template_file}!")
-             return
+    def _generate(self, span):
+        # 1. Load Data (one canonical shift per real shift)
+        listings = self._load_shifts()
+        shifts = link_duplicates(listings) if self.dedupe else listings
 
+        # 2. Group Data by Agency, then Location; each agency's shard carries its own cluster pyramid
+        by_agency = {}
+        for shift in shifts:
+            for agency in shift.get('agencies') or [shift.get('agency') or 'Unknown']:
+                by_agency.setdefault(agency, []).append(shift)
+
+        shards = []
+        for agency in sorted(by_agency):
+            locations_list = self.group_by_location(by_agency[agency])
+            if not locations_list:
+                continue
+            shard = self._pack(_slug(agency), {"cells": cluster_pyramid(locations_list), "locations": locations_list})
+            shard.update(agency=agency, count=sum(loc["count"] for loc in locations_list), locations=len(locations_list))
+            shards.append(shard)
+
+        # The unfiltered map starts from one pyramid over every agency and fetches shards only when zoomed in
+        located = self.group_by_location(shifts)
+        agencies = [s["agency"] for s in shards]
+        overview = self._pack("overview", {"agencies": agencies, "cells": cluster_pyramid(located, agencies=agencies)})
+        overview.update(count=sum(loc["count"] for loc in located), locations=len(located))
+        files = shards + [overview]
+        data_hash = hashlib.sha256("|".join(f["file"] for f in files).encode('utf-8')).hexdigest()[:16]
+
+        # 3. Page: the template with the manifest location filled in (rewritten only if it differs)
+        if not os.path.exists(self.template_file):
+            print(f"Template file missing at {self.template_file}!")
+            return
         with open(self.template_file, 'r', encoding='utf-8') as f:
             template = f.read()
+        html = template.replace(MANIFEST_PLACEHOLDER, f'const manifestUrl = {json.dumps(self.data_url)};')
+        self._write_if_changed(self.output_file, html.encode('utf-8'))
+
+        span.count("shifts", len(shifts))
+        span.count("duplicate_listings", len(listings) - len(shifts))
+        span.count("locations", len(located))
+
+        # 4. Skip everything else when the grouped data has not changed
+        manifest_path = os.path.join(self.data_dir, 'manifest.json')
+        previous = self._read_manifest(manifest_path)
+        if previous.get("hash") == data_hash and \
+                all(os.path.exists(path) for f in files for path in self._shard_paths(f["file"])):
+            span.status = "unchanged"
+            print(f"Map data unchanged ({data_hash}), nothing regenerated.")
+            return
+
+        # 5. Write new files (existing names already hold identical bytes), then the manifest
+        os.makedirs(self.data_dir, exist_ok=True)
+        for f in files:
+            self._write_shard(f["file"], f.pop("payload"))
+        manifest = {
+            "hash": data_hash,
+            "updated": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC"),
+            "levels": [{"precision": precision, "maxZoom": zoom} for precision, zoom in CLUSTER_LEVELS],
+            "detailZoom": DETAIL_ZOOM,
+            "overview": overview,
+            "shards": shards,
+        }
+        _write_atomic(manifest_path, json.dumps(manifest, indent=1).encode('utf-8'))
+        self._remove_stale(files)
+
+        span.count("shards", len(shards))
+        print(f"Map generated at {self.output_file}: {len(located)} locations "
+              f"in {len(shards)} shards under {self.data_dir} ({data_hash}).")
+
+    @staticmethod
+    def _pack(name, content):
+        payload = json.dumps(content, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()[:12]
+        return {"file": f"{name}.{digest}.json", "bytes": len(payload), "payload": payload}
+
+    @staticmethod
+    def _read_manifest(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_if_changed(path, data):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, data)
+
+    def _shard_paths(self, name):
+        path = os.path.join(self.data_dir, name)
+        if not self.precompress:
+            return [path]
+        # For servers that send precompressed files as-is (e.g. nginx gzip_static / brotli_static)
+        return [path, path + '.gz'] + ([path + '.br'] if brotli is not None else [])
+
+    def _write_shard(self, name, payload):
+        # Each output is checked on its own, so a shard written before precompression
+        # was enabled (or brotli installed) still gets its .gz/.br
+        for path in self._shard_paths(name):
+            if os.path.exists(path):
+                continue
+            if path.endswith('.gz'):
+                _write_atomic(path, gzip.compress(payload, compresslevel=9, mtime=0))
+            elif path.endswith('.br'):
+                _write_atomic(path, brotli.compress(payload))
+            else:
+                _write_atomic(path, payload)
 
-        # 4. Inject Data
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M UTC")
-        locations_js = json.dumps(locations_list, indent=2)
-        
-        # Replace placeholders defined in the template
-        html = template.replace('const locationsData = []; // WILL BE REPLACED BY PYTHON', f'const locationsData = {locations_js};')
-        html = html.replace('const lastUpdate = "NEVER"; // WILL BE REPLACED BY PYTHON', f'const lastUpdate = "{timestamp}";')
-
-        # 5. Write Output
-        output_dir = os.path.dirname(self.output_file)
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
-        
-        print(f"Map generated at {self.output_file} with {len(locations_list)} locations.")
+    def _remove_stale(self, shards):
+        # Only hashed shards; other files here (manifest.json, heatmap.json) are kept
+        keep = {s["file"] for s in shards}
+        for name in os.listdir(self.data_dir):
+            base = re.sub(r"\.(gz|br)$", "", name)
+            if re.search(r"\.[0-9a-f]{12}\.json$", base) and base not in keep:
+                os.remove(os.path.join(self.data_dir, name))
 
 if __name__ == "__main__":
     gen = MapGenerator()
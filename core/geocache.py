@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+class GeoCache:
+    """
+    Write-behind cache for geocoding results.
+
+    New entries are buffered in memory and written to disk in batches
+    (every `flush_every` new entries, every `flush_interval` seconds, and on
+    close) using an atomic temp-file + rename, so a crash can never leave a
+    half-written geocache.json behind.
+
+    On disk, found locations are stored as [lat, lon] like before; failed
+    lookups are stored as {"miss": <unix time>} and are trusted for
+    `negative_ttl` seconds before the query is tried again.
+    """
+    def __init__(self, path='data/geocache.json', flush_every=25, flush_interval=30, negative_ttl=14 * 24 * 3600):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.negative_ttl = negative_ttl
+        self._lock = threading.RLock()
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "writes": 0, "flushes": 0}
+        self.entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError) as e:
+            # Keep the broken file for inspection instead of silently starting over
+            backup = f"{self.path}.corrupt"
+            shutil.copyfile(self.path, backup)
+            print(f"Geocache at {self.path} is unreadable ({e}); saved a copy to {backup}")
+            return {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, query):
+        """
+        Returns [lat, lon] for a known location, (None, None) for a recent
+        failed lookup, or None if the query has to be looked up.
+        """
+        with self._lock:
+            entry = self.entries.get(query)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            if isinstance(entry, dict):
+                if time.time() - entry.get("miss", 0) < self.negative_ttl:
+                    self.stats["negative_hits"] += 1
+                    return (None, None)
+                # Expired negative entry: look it up again
+                self.stats["misses"] += 1
+                return None
+
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, query, lat_lon):
+        self._set(query, [lat_lon[0], lat_lon[1]])
+
+    def put_miss(self, query):
+        self._set(query, {"miss": int(time.time())})
+
+    def _set(self, query, value):
+        with self._lock:
+            self.entries[query] = value
+            self.stats["writes"] += 1
+            self._dirty += 1
+            if self._dirty >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.geocache-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self.entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._dirty = 0
+            self._last_flush = time.monotonic()
+            self.stats["flushes"] += 1
+
+    def summary(self):
+        s = self.stats
+        return (f"Geocache: {len(self.entries)} entries, {s['hits']} hits, {s['negative_hits']} negative hits, "
+                f"{s['misses']} misses, {s['writes']} writes in {s['flushes']} flushes")
@@ -1,69 +1,126 @@
 import pgeocode
-import json
-import os
 import time
 from geopy.geocoders import Nominatim
 from geopy.exc import GeopyError
+from core.gazetteer import Gazetteer
+from core.geocache import GeoCache
 
 class UKGeocoder:
     def __init__(self, cache_file='data/geocache.json'):
         self.nomi = pgeocode.Nominatim('gb')
+        # Offline town/area index built from the same GB dataset
+        self.gazetteer = Gazetteer.from_pgeocode(self.nomi)
         # Initialize geopy for town name lookups
         self.geolocator = Nominatim(user_agent="optom_locum_scraper_v2")
         self.cache_file = cache_file
-        self.cache = self._load_cache()
-
-    def _load_cache(self):
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def _save_cache(self):
-        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+        # Write-behind cache; call close() before exiting so buffered entries are saved
+        self.cache = GeoCache(cache_file)
+
+    @staticmethod
+    def normalize(postcode_or_town):
+        return postcode_or_town.upper().strip()
+
+    @staticmethod
+    def looks_like_postcode(query):
+        # We only try pgeocode if it looks like a postcode (contains a digit)
+        return any(char.isdigit() for char in query)
+
+    def lookup_cached(self, query):
+        """
+        [lat, lon] if known, (None, None) if it recently failed, None to look it up.
+        """
+        return self.cache.get(query)
+
+    def _remember(self, query, res):
+        self.cache.put(query, res)
+        return res
+
+    def close(self):
+        self.cache.flush()
+        print(self.cache.summary())
+
+    def lookup_postcode(self, query):
+        """
+        Offline postcode lookup via pgeocode. Returns (lat, lon) or None.
+        """
+        data = self.nomi.query_postal_code(query)
+        if not data.empty and str(data.latitude) != 'nan':
+            return self._remember(query, (float(data.latitude), float(data.longitude)))
+        return None
+
+    def lookup_postcodes(self, queries):
+        """
+        Vectorised pgeocode lookup for many postcodes in one pandas merge.
+        Returns {query: (lat, lon)} for the ones that resolved.
+        """
+        queries = list(queries)
+        if not queries:
+            return {}
+
+        data = self.nomi.query_postal_code(queries)
+        found = {}
+        # A left merge keeps one row per query, in order
+        for query, lat, lon in zip(queries, data['latitude'], data['longitude']):
+            if lat == lat and lon == lon: # NaN check
+                found[query] = self._remember(query, (float(lat), float(lon)))
+        return found
+
+    def lookup_place(self, query):
+        """
+        Offline town/area lookup in the gazetteer. Returns (lat, lon) or None.
+        Not cached: it is already an in-memory dict lookup.
+        """
+        return self.gazetteer.lookup(query)
+
+    def lookup_town(self, query):
+        """
+        Online lookup via geopy (Nominatim). Callers are responsible for
+        respecting Nominatim's 1 request/second limit.
+        """
+        try:
+            # We add ", UK" to the query to make it more specific
+            location = self.geolocator.geocode(f"{query}, UK")
+            if location:
+                return self._remember(query, (location.latitude, location.longitude))
+            # Nominatim answered but found nothing: don't ask again for a while
+            self.cache.put_miss(query)
+        except GeopyError:
+            # Network/service trouble is not a real miss, so it isn't cached
+            pass
+        return None
 
     def get_lat_lon(self, postcode_or_town):
         """
         Returns (lat, lon) for a given postcode or town name.
-        Checks local cache first, then pgeocode for postcodes, 
+        Checks local cache first, then pgeocode for postcodes,
         then geopy for town names.
         """
         if not postcode_or_town:
             return None, None
 
-        query = postcode_or_town.upper().strip()
-        
+        query = self.normalize(postcode_or_town)
+
         # Check cache
-        if query in self.cache:
-            return self.cache[query]
+        cached = self.lookup_cached(query)
+        if cached:
+            return cached
 
         # 1. Try as Postcode first (pgeocode)
-        # We only try this if it looks like a postcode (contains a digit)
-        if any(char.isdigit() for char in query):
-            data = self.nomi.query_postal_code(query)
-            if not data.empty and str(data.latitude) != 'nan':
-                res = (float(data.latitude), float(data.longitude))
-                self.cache[query] = res
-                self._save_cache()
+        if self.looks_like_postcode(query):
+            res = self.lookup_postcode(query)
+            if res:
                 return res
 
-        # 2. If it failed or is likely a town name, use geopy (Nominatim)
-        try:
-            # We add ", UK" to the query to make it more specific
-            location = self.geolocator.geocode(f"{postcode_or_town}, UK")
-            if location:
-                res = (location.latitude, location.longitude)
-                self.cache[query] = res
-                self._save_cache()
-                # Nominatim requires a 1s delay per request (we are cached so it's rare)
-                time.sleep(1)
-                return res
-        except GeopyError:
-            pass
-        
+        # 2. Town names: offline gazetteer before any network call
+        res = self.lookup_place(query)
+        if res:
+            return res
+
+        # 3. Still unknown, use geopy (Nominatim)
+        res = self.lookup_town(query)
+        if res:
+            # Nominatim requires a 1s delay per request (we are cached so it's rare)
+            time.sleep(1)
+            return res
+
         return None, None
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from core.geocoder import UKGeocoder
+from core.metrics import Metrics
+
+class TokenBucket:
+    """
+    Async rate limiter: at most `rate` acquisitions per second on average,
+    with bursts up to `capacity`. Waiters sleep without blocking the loop.
+    """
+    def __init__(self, rate=1.0, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class GeocodingService:
+    """
+    Process-wide async front end to UKGeocoder, shared by every scraper.
+    - pgeocode / Nominatim calls run in worker threads, off the event loop
+    - Nominatim's 1 req/s policy is enforced by a global token bucket
+    - concurrent lookups of the same query share a single in-flight lookup
+    """
+    _shared = None
+
+    def __init__(self, geocoder=None, nominatim_rate=1.0):
+        self._geocoder = geocoder
+        self._init_lock = asyncio.Lock()
+        self.bucket = TokenBucket(rate=nominatim_rate)
+        self.metrics = Metrics.shared()
+        self._inflight = {}
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    async def geocoder(self):
+        # Loading the pgeocode GB dataset and geocache.json is slow, do it once in a thread
+        async with self._init_lock:
+            if self._geocoder is None:
+                self._geocoder = await asyncio.to_thread(UKGeocoder)
+            return self._geocoder
+
+    async def close(self):
+        """
+        Flushes the write-behind geocache. Call once at the end of the run.
+        """
+        if self._geocoder is not None:
+            await asyncio.to_thread(self._geocoder.close)
+            for key, value in self._geocoder.cache.stats.items():
+                self.metrics.count(f"geocache_{key}", value)
+
+    async def fill_coordinates(self, shifts, report=True):
+        """
+        Geocodes a batch of Shift records (the pipeline sends micro-batches
+        as agencies stream in). Collects the distinct postcodes/towns,
+        resolves all cache misses among the postcodes in one vectorised
+        pgeocode call, sends the rest through the gazetteer / rate-limited
+        Nominatim path concurrently, then writes lat/lon back.
+        `report` prints a one-line summary for the batch.
+        """
+        started = time.monotonic()
+        geo = await self.geocoder()
+
+        # Postcode preferred, otherwise the location text
+        wanted = {}
+        for shift in shifts:
+            if shift.lat is not None and shift.lon is not None:
+                continue
+            text = shift.postcode or shift.location
+            if text:
+                wanted.setdefault(geo.normalize(text), []).append(shift)
+
+        resolved = {}
+        postcodes = []
+        with self.metrics.span("geocode_cache") as span:
+            for query in wanted:
+                cached = geo.lookup_cached(query)
+                if cached:
+                    resolved[query] = cached
+                elif geo.looks_like_postcode(query):
+                    postcodes.append(query)
+            span.count("queries", len(wanted))
+            span.count("hits", len(resolved))
+
+        if postcodes:
+            with self.metrics.span("geocode_pgeocode") as span:
+                found = await asyncio.to_thread(geo.lookup_postcodes, postcodes)
+                span.count("postcodes", len(postcodes))
+                span.count("found", sum(1 for v in found.values() if v))
+            resolved.update(found)
+
+        remaining = [q for q in wanted if q not in resolved]
+        # Postcodes here already missed the batched pgeocode lookup
+        results = await asyncio.gather(*(self._resolve(geo, q, skip_postcode=True) for q in remaining))
+        resolved.update(zip(remaining, results))
+
+        located = 0
+        for query, matched in wanted.items():
+            lat, lon = resolved.get(query) or (None, None)
+            for shift in matched:
+                shift.lat, shift.lon = lat, lon
+            if lat is not None:
+                located += len(matched)
+
+        if report:
+            print(f"Geocoded {located}/{sum(len(m) for m in wanted.values())} shifts "
+                  f"({len(wanted)} distinct locations, {len(postcodes)} batched postcodes) "
+                  f"in {time.monotonic() - started:.2f}s")
+        return shifts
+
+    async def _resolve(self, geo, query, skip_postcode=False):
+        task = self._inflight.get(query)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(geo, query, skip_postcode))
+            self._inflight[query] = task
+            task.add_done_callback(lambda _: self._inflight.pop(query, None))
+
+        # shield: one caller being cancelled must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def get_lat_lon(self, postcode_or_town):
+        """
+        Async equivalent of UKGeocoder.get_lat_lon.
+        """
+        if not postcode_or_town:
+            return None, None
+
+        geo = await self.geocoder()
+        query = geo.normalize(postcode_or_town)
+
+        cached = geo.lookup_cached(query)
+        if cached:
+            return cached
+
+        return await self._resolve(geo, query)
+
+    async def _lookup(self, geo, query, skip_postcode=False):
+        # 1. Try as Postcode first (pgeocode, offline)
+        if not skip_postcode and geo.looks_like_postcode(query):
+            res = await asyncio.to_thread(geo.lookup_postcode, query)
+            if res:
+                return res
+
+        # 2. Town names: offline gazetteer first (no thread needed, it's a dict lookup)
+        res = geo.lookup_place(query)
+        self.metrics.count("gazetteer_lookups", outcome="hit" if res else "miss")
+        if res:
+            return res
+
+        # 3. Anything else goes to Nominatim, one request per token
+        with self.metrics.span("nominatim_rate_limit"):
+            await self.bucket.acquire()
+        with self.metrics.span("geocode_nominatim") as span:
+            res = await asyncio.to_thread(geo.lookup_town, query)
+            span.count("found", 1 if res else 0)
+        if res:
+            return res
+
+        return None, None
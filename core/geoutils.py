@@ -0,0 +1,100 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in kilometres between two points in degrees.
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat = p2 - p1
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(lat, lon, precision=7):
+    """
+    Standard base32 geohash. Precision 5 is ~5km cells, 7 is ~150m.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def geohash_bounds(geohash):
+    """
+    (min_lat, min_lon, max_lat, max_lon) of a geohash cell.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if bits >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def geohash_cell_size(precision):
+    """
+    (lat_degrees, lon_degrees) covered by one cell at this precision.
+    """
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def geohash_cells(min_lat, min_lon, max_lat, max_lon, precision):
+    """
+    Every geohash cell of the given precision that overlaps a bounding box.
+    """
+    dlat, dlon = geohash_cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while lat <= max_lat + dlat:
+        lon = min_lon
+        while lon <= max_lon + dlon:
+            cells.add(geohash_encode(min(lat, max_lat), min(lon, max_lon), precision))
+            lon += dlon
+        lat += dlat
+    return sorted(cells)
+
+def geohash_cover(min_lat, min_lon, max_lat, max_lon, max_cells=32):
+    """
+    Geohash prefixes that together cover a bounding box, at the finest
+    precision that needs no more than `max_cells` cells.
+    """
+    for precision in range(7, 0, -1):
+        dlat, dlon = geohash_cell_size(precision)
+        rows = int((max_lat - min_lat) / dlat) + 2
+        cols = int((max_lon - min_lon) / dlon) + 2
+        if rows * cols <= max_cells or precision == 1:
+            break
+    return geohash_cells(min_lat, min_lon, max_lat, max_lon, precision)
+
+def radius_bbox(lat, lon, radius_km):
+    """
+    (min_lat, min_lon, max_lat, max_lon) enclosing a circle of `radius_km`.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by ~0
+    dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
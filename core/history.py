@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from core.parsing import job_id_from_link, parse_amount, parse_date
+from core.shift import as_record
+
+# Fields whose change means a stored shift has to be rewritten
+TRACKED_FIELDS = ("company", "postcode", "rate", "total", "lat", "lon", "link", "shift_id")
+
+def shift_fingerprint(shift):
+    """
+    Stable id for a shift across runs: agency + link/ID + date + time + location.
+    Agencies without per-shift links fall back to the listing URL, which is
+    constant, so date/time/location carry the identity there.
+    """
+    parts = [
+        shift.get('agency') or '',
+        str(shift.get('shift_id') or shift.get('link') or ''),
+        str(shift.get('date') or ''),
+        str(shift.get('time') or ''),
+        (shift.get('location') or '').strip().upper(),
+    ]
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# Agencies whose fingerprint uses a shift_id that old history.json records only carry in their link
+LEGACY_SHIFT_IDS = {"LocateALocum": job_id_from_link}
+
+def load_legacy(path):
+    """
+    Stored records for the shifts in an old overwrite-every-run history.json
+    array, fingerprinted the way a fresh scrape of the same shift is. They
+    are stamped with the file's modification time as first/last seen.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        shifts = json.load(f)
+
+    imported_at = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    records = []
+    for shift in shifts:
+        derive_id = LEGACY_SHIFT_IDS.get(shift.get('agency'))
+        if derive_id and not shift.get('shift_id'):
+            shift = dict(shift, shift_id=derive_id(shift.get('link')))
+        records.append(dict(shift, id=shift_fingerprint(shift), first_seen=imported_at, last_seen=imported_at,
+                            status="active"))
+    return records
+
+class ShiftHistory:
+    """
+    Incremental shift history kept as an append-only JSON Lines log.
+
+    Each run appends only:
+      {"op": "put", "rec": {...}}                       new or changed shifts
+      {"op": "seen", "agency", "at", "ids": [...]}      one line per agency run
+      {"op": "expire", "agency", "at", "ids": [...]}    shifts gone from a complete run
+    Loading replays the log into one record per fingerprint, with
+    first_seen / last_seen timestamps and an active/expired status.
+    The log is compacted (atomically rewritten) only once it has grown to
+    several times the number of live records.
+    """
+    def __init__(self, path='data/history.jsonl', legacy_path='data/history.json', compact_ratio=4):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_ratio = compact_ratio
+        self.records = {}
+        self.active = {}  # agency -> set of active fingerprints
+        self._pending = []
+        self._log_lines = 0
+        self._load()
+
+    # --- Loading ---
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        # A torn last line from a crash mid-append; everything before it is intact
+                        print(f"Skipping unreadable line in {self.path}")
+                        continue
+                    self._log_lines += 1
+        elif self.legacy_path and os.path.exists(self.legacy_path):
+            self._import_legacy()
+
+    def _import_legacy(self):
+        # One-off migration from the old overwrite-every-run history.json array
+        records = load_legacy(self.legacy_path)
+        for record in records:
+            self._record({"op": "put", "rec": record})
+
+        print(f"Imported {len(records)} shifts from {self.legacy_path}")
+        # The old file stays where it is; once the log exists it is never read again
+        self.commit()
+
+    def _apply(self, entry):
+        op = entry.get("op")
+        if op == "put":
+            record = entry["rec"]
+            self.records[record["id"]] = record
+            agency_ids = self.active.setdefault(record.get("agency"), set())
+            if record.get("status") == "active":
+                agency_ids.add(record["id"])
+            else:
+                agency_ids.discard(record["id"])
+        elif op == "seen":
+            agency_ids = self.active.setdefault(entry["agency"], set())
+            for shift_id in entry["ids"]:
+                record = self.records.get(shift_id)
+                if record is not None:
+                    record["last_seen"] = entry["at"]
+                    record["status"] = "active"
+                    agency_ids.add(shift_id)
+        elif op == "expire":
+            agency_ids = self.active.setdefault(entry["agency"], set())
+            for shift_id in entry["ids"]:
+                record = self.records.get(shift_id)
+                if record is not None:
+                    record["status"] = "expired"
+                    record["expired_at"] = entry["at"]
+                agency_ids.discard(shift_id)
+
+    # --- Merging a run ---
+
+    def merge(self, agency, shifts, complete=True, now=None):
+        """
+        Merges one agency's scrape. Cost is proportional to the shifts
+        scraped, not the size of the history. When `complete` is False
+        (the agency failed or timed out) nothing is expired.
+        Returns counts of new / changed / seen / expired shifts.
+        """
+        now = now or utc_now()
+        shifts = [as_record(s) for s in shifts]
+        stats = self.upsert(agency, shifts, now)
+        stats["expired"] = self.expire(agency, {shift_fingerprint(s) for s in shifts}, now) if complete else 0
+        return stats
+
+    def upsert(self, agency, shifts, now=None):
+        """
+        Records a batch of one agency's shifts without expiring anything, so
+        a run can be written as it streams in. Returns new / changed / seen counts.
+        """
+        now = now or utc_now()
+        stats = {"new": 0, "changed": 0, "seen": 0}
+        seen_ids = []
+
+        for shift in map(as_record, shifts):
+            shift_id = shift_fingerprint(shift)
+            existing = self.records.get(shift_id)
+
+            if existing is None:
+                record = dict(shift, id=shift_id, first_seen=now, last_seen=now, status="active")
+                stats["new"] += 1
+            elif any(existing.get(k) != shift.get(k) for k in TRACKED_FIELDS if k in shift):
+                record = dict(existing, **shift, last_seen=now, status="active")
+                stats["changed"] += 1
+            else:
+                seen_ids.append(shift_id)
+                continue
+
+            self._record({"op": "put", "rec": record})
+
+        if seen_ids:
+            self._record({"op": "seen", "agency": agency, "at": now, "ids": seen_ids})
+        stats["seen"] = len(seen_ids)
+        return stats
+
+    def touch(self, agency, ids, now=None):
+        """
+        Marks stored shifts as seen in this run without rewriting them (rows
+        unchanged since the last run). Returns the ids that were found.
+        """
+        found = [i for i in ids if i in self.records]
+        if found:
+            self._record({"op": "seen", "agency": agency, "at": now or utc_now(), "ids": sorted(found)})
+        return set(found)
+
+    def expire(self, agency, current_ids, now=None):
+        """
+        Marks the agency's active shifts that are not in `current_ids`
+        (fingerprints from a complete run) as expired. Returns how many.
+        """
+        gone = sorted(self.active.get(agency, set()) - set(current_ids))
+        if gone:
+            self._record({"op": "expire", "agency": agency, "at": now or utc_now(), "ids": gone})
+        return len(gone)
+
+    def _record(self, entry):
+        self._pending.append(entry)
+        self._apply(entry)
+
+    # --- Persistence ---
+
+    def commit(self):
+        """
+        Appends this run's entries to the log (or compacts it if it has grown too large).
+        """
+        if not self._pending:
+            return
+
+        if self._log_lines + len(self._pending) > self.compact_ratio * max(len(self.records), 50):
+            self.compact()
+            return
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        self._log_lines += len(self._pending)
+        self._pending = []
+
+    def compact(self):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.history-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for record in self.records.values():
+                f.write(json.dumps({"op": "put", "rec": record}, separators=(',', ':')) + "\n")
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self.records)
+        self._pending = []
+
+    # --- Reading ---
+
+    def export(self):
+        """
+        Nothing to do: the log itself is the text copy kept in git.
+        """
+
+    def close(self):
+        self.commit()
+
+    def active_shifts(self):
+        return [r for r in self.records.values() if r.get("status") == "active"]
+
+    def all_shifts(self):
+        return list(self.records.values())
+
+    def query(self, date_from=None, date_to=None, agency=None, bbox=None, min_total=None, status='active'):
+        """
+        Same filters as SqliteShiftStore.query, evaluated by a full scan.
+        """
+        results = []
+        for record in self.records.values():
+            if status and record.get("status") != status:
+                continue
+            if agency and record.get("agency") != agency:
+                continue
+            if date_from or date_to:
+                day = record.get("day") or parse_date(record.get("date"))
+                if day is None or (date_from and str(day) < str(date_from)) or (date_to and str(day) > str(date_to)):
+                    continue
+            if min_total is not None and (parse_amount(record.get("total")) or 0) < min_total:
+                continue
+            if bbox:
+                lat, lon = record.get("lat"), record.get("lon")
+                if lat is None or lon is None or not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
+                    continue
+            results.append(record)
+        return results
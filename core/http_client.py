@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+from http.cookies import Morsel
+import aiohttp
+from yarl import URL
+from core.browser import USER_AGENT
+
+def _to_morsel(cookie):
+    """
+    Converts a Playwright cookie dict into aiohttp's update_cookies arguments.
+    Host-only cookies (no leading dot) stay scoped to their exact host.
+    """
+    domain = cookie.get('domain', '')
+    morsel = Morsel()
+    morsel.set(cookie['name'], cookie['value'], cookie['value'])
+    morsel['path'] = cookie.get('path', '/')
+    if domain.startswith('.'):
+        morsel['domain'] = domain
+    if cookie.get('secure'):
+        morsel['secure'] = True
+    return {cookie['name']: morsel}, URL(f"https://{domain.lstrip('.')}/")
+
+class HttpFetcher:
+    """
+    Pooled keep-alive HTTP client that reuses the cookies of a browser login.
+    Used by agencies whose listings are plain authenticated HTML/JSON, so
+    Chromium is only needed for the login itself.
+    """
+    def __init__(self, cookies, concurrency=4, timeout=30):
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.cookies = cookies
+        self.session = None
+        self.requests = 0
+        self.bytes = 0
+
+    async def __aenter__(self):
+        # unsafe=True so cookies also stick to IP hosts (local fixture servers)
+        jar = aiohttp.CookieJar(unsafe=True)
+        for cookie in self.cookies:
+            jar.update_cookies(*_to_morsel(cookie))
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=jar,
+            headers={"User-Agent": USER_AGENT, "Accept-Language": "en-GB"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def fetch(self, url):
+        """
+        Returns (body_text, is_json) for a URL, or (None, False) on a non-200.
+        """
+        async with self.session.get(url) as response:
+            body = await response.text()
+            self.requests += 1
+            self.bytes += len(body)
+            if response.status != 200:
+                print(f"   HTTP {response.status} for {url}")
+                return None, False
+            return body, 'json' in (response.headers.get('Content-Type') or '')
+
+    async def fetch_pages(self, url_template, parse, max_pages=20):
+        """
+        Fetches `url_template` (with an optional {page} placeholder) in
+        batches of `concurrency` pages and returns the parsed rows.
+        Stops at the first page that yields nothing, or that starts with a
+        row already seen (a site ignoring ?page= serves page 1 every time).
+        """
+        started = time.monotonic()
+        rows = []
+
+        if '{page}' not in url_template:
+            body, is_json = await self.fetch(url_template)
+            rows = parse(body, is_json) if body else []
+        else:
+            page = 1
+            seen = set()
+            while page <= max_pages:
+                batch = range(page, min(page + self.concurrency, max_pages + 1))
+                results = await asyncio.gather(*(self.fetch(url_template.format(page=p)) for p in batch))
+
+                finished = False
+                for body, is_json in results:
+                    page_rows = parse(body, is_json) if body else []
+                    first = json.dumps(page_rows[0], sort_keys=True, default=str) if page_rows else None
+                    if not page_rows or first in seen:
+                        finished = True
+                        break
+                    seen.add(first)
+                    rows.extend(page_rows)
+
+                if finished:
+                    break
+                page += len(batch)
+
+        print(f"   HTTP fetched {self.requests} pages ({self.bytes / 1024:.0f} KB) "
+              f"-> {len(rows)} rows in {time.monotonic() - started:.2f}s")
+        return rows
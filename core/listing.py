@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import tempfile
+
+def row_hash(row):
+    """
+    Hash of one raw listing row as extracted, before any parsing. A JSON
+    string (Locumbell's data-row-data attribute) is hashed as the data it
+    holds, so the same row hashes alike whether it came from the DOM or
+    the API.
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            pass
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+def listing_fingerprint(hashes):
+    """
+    Fingerprint of a whole listing: its row hashes in listed order.
+    """
+    return hashlib.sha1("|".join(hashes).encode('utf-8')).hexdigest()[:16]
+
+class ListingMemo:
+    """
+    What each agency's listing looked like on its last complete run:
+
+        {"<agency>": {"fingerprint": "...", "rows": {"<row hash>": "<shift id>"}}}
+
+    A row whose hash is in the memo produced that stored shift last time,
+    so it doesn't need parsing, geocoding or writing again. Only complete
+    runs update an agency's entry, so a partial listing never hides rows.
+    """
+    def __init__(self, path='data/listings.json'):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                # Losing the memo only means one full run
+                print(f"Listing memo at {path} is unreadable, starting afresh")
+
+    def fingerprint(self, agency):
+        return (self.entries.get(agency) or {}).get("fingerprint")
+
+    def rows(self, agency):
+        return (self.entries.get(agency) or {}).get("rows") or {}
+
+    def record(self, agency, fingerprint, rows):
+        self.entries[agency] = {"fingerprint": fingerprint, "rows": rows}
+        self.dirty = True
+
+    def forget(self, agency, shift_ids):
+        """
+        Drops the rows that map to `shift_ids`, so they are extracted again.
+        """
+        rows = self.rows(agency)
+        stale = [h for h, shift_id in rows.items() if shift_id in shift_ids]
+        for h in stale:
+            del rows[h]
+        if stale:
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.listings-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,192 @@
+import contextlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; spans are still timed, just without RSS
+    resource = None
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process so far (ru_maxrss is KB on
+    Linux, bytes on macOS). None where the resource module is missing.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class Span:
+    """
+    One timed stage. `count()` attaches counts (rows extracted, cache hits...)
+    to it; `status` can be set before the span closes.
+    """
+    __slots__ = ("name", "labels", "started", "seconds", "counts", "status", "peak_rss")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.started = time.monotonic()
+        self.seconds = None
+        self.counts = {}
+        self.status = "ok"
+        self.peak_rss = None
+
+    def count(self, key, value=1):
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def to_dict(self, run_started):
+        return {
+            "name": self.name,
+            "labels": self.labels,
+            "offset": round(self.started - run_started, 3),
+            "seconds": round(self.seconds, 4),
+            "status": self.status,
+            "counts": self.counts,
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+class Metrics:
+    """
+    Spans and counters for one run, written at the end as a JSON report
+    (data/run_report.json) and a Prometheus text file (data/metrics.prom)
+    so runs can be compared per agency and per stage.
+
+        with metrics.span("extract", agency="Locumotive") as span:
+            rows = ...
+            span.count("rows", len(rows))
+    """
+    _shared = None
+
+    def __init__(self, prefix='locum'):
+        self.prefix = prefix
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.monotonic()
+        self.spans = []
+        self.counters = {}
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def reset(cls):
+        """
+        Starts a fresh shared instance (the benchmark measures each run on its own).
+        """
+        cls._shared = cls()
+        return cls._shared
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        span = Span(name, labels)
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            span.seconds = time.monotonic() - span.started
+            span.peak_rss = peak_rss_bytes()
+            self.spans.append(span)
+
+    def observe(self, name, seconds, status="ok", **labels):
+        """
+        Records a span whose duration was measured elsewhere.
+        """
+        span = Span(name, labels)
+        span.started -= seconds
+        span.seconds = seconds
+        span.status = status
+        span.peak_rss = peak_rss_bytes()
+        self.spans.append(span)
+        return span
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    # --- Reports ---
+
+    def report(self):
+        return {
+            "started_at": self.started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "seconds": round(time.monotonic() - self._started, 3),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "spans": [s.to_dict(self._started) for s in self.spans],
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(self.counters.items())],
+        }
+
+    def _metric_name(self, *parts):
+        return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join((self.prefix,) + parts))
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        escaped = (
+            k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for k, v in sorted(labels.items())
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def prometheus(self):
+        """
+        Prometheus text exposition format: per stage/label set the summed
+        span duration and span count, every counter, and run-level gauges.
+        """
+        durations = {}
+        for span in self.spans:
+            key = (span.name, tuple(sorted({**span.labels, "status": span.status}.items())))
+            total, n = durations.get(key, (0.0, 0))
+            durations[key] = (total + span.seconds, n + 1)
+
+        lines = [
+            f"# HELP {self._metric_name('span_seconds')} Time spent in each stage of the run.",
+            f"# TYPE {self._metric_name('span_seconds')} summary",
+        ]
+        for (name, labels), (total, n) in sorted(durations.items()):
+            label_text = self._labels({"stage": name, **dict(labels)})
+            lines.append(f"{self._metric_name('span_seconds_sum')}{label_text} {total:.6f}")
+            lines.append(f"{self._metric_name('span_seconds_count')}{label_text} {n}")
+
+        by_name = {}
+        for (name, labels), value in sorted(self.counters.items()):
+            by_name.setdefault(name, []).append((dict(labels), value))
+        for name, samples in by_name.items():
+            metric = self._metric_name(name, 'total')
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{self._labels(labels)} {value:g}" for labels, value in samples)
+
+        lines.append(f"# TYPE {self._metric_name('run_seconds')} gauge")
+        lines.append(f"{self._metric_name('run_seconds')} {time.monotonic() - self._started:.3f}")
+        lines.append(f"# TYPE {self._metric_name('run_timestamp_seconds')} gauge")
+        lines.append(f"{self._metric_name('run_timestamp_seconds')} {self.started_at.timestamp():.0f}")
+        rss = peak_rss_bytes()
+        if rss is not None:
+            lines.append(f"# TYPE {self._metric_name('peak_rss_bytes')} gauge")
+            lines.append(f"{self._metric_name('peak_rss_bytes')} {rss}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory='data', report_name='run_report.json', prometheus_name='metrics.prom'):
+        os.makedirs(directory, exist_ok=True)
+        self._write_atomic(os.path.join(directory, report_name), json.dumps(self.report(), indent=2))
+        self._write_atomic(os.path.join(directory, prometheus_name), self.prometheus())
+        print(f"Run report written to {directory}/{report_name} and {directory}/{prometheus_name}")
+
+    @staticmethod
+    def _write_atomic(path, text):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.metrics-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
@@ -0,0 +1,74 @@
+import re
+from datetime import datetime
+
+# Date formats seen across agency listings ("Thu 01 Jan 2026", "01/01/2026", ...)
+DATE_FORMATS = (
+    "%a %d %b %Y",
+    "%A %d %B %Y",
+    "%a %d %B %Y",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%Y-%m-%d",
+)
+
+# Time formats for either end of a range ("2:00 PM", "9am", "17:30")
+TIME_FORMATS = (
+    "%I:%M %p",
+    "%I:%M%p",
+    "%I %p",
+    "%I%p",
+    "%H:%M",
+    "%H:%M:%S",
+)
+
+_DATE_CLEANUP = re.compile(r"(\d+)(st|nd|rd|th)\b")
+
+def clean_date_text(text):
+    """
+    Listing date text reduced to something strptime can read: ordinal
+    suffixes and commas dropped, ranges ("01/01/2026 - 03/01/2026") cut
+    to their first day.
+    """
+    text = _DATE_CLEANUP.sub(r"\1", str(text)).replace(",", " ")
+    text = re.split(r"\s+(?:-|to)\s+", text.strip())[0]
+    return re.sub(r"\s+", " ", text)
+
+_JOB_ID = re.compile(r"/jobs/(\d+)")
+
+def job_id_from_link(link):
+    """
+    LocateALocum job id: the number in its /jobs/<id> links, including
+    the login?returnUrl=/jobs/<id> form of older records. "" if absent.
+    """
+    match = _JOB_ID.search(link or "")
+    return match.group(1) if match else ""
+
+def parse_date(text):
+    """
+    Returns a datetime.date for a listing date string, or None.
+    Ranges ("01/01/2026 - 03/01/2026") resolve to their first day.
+    """
+    if not text:
+        return None
+    text = clean_date_text(text)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_amount(value):
+    """
+    Numeric value of "£1,234.50", "76.00", 325 etc. None if there is no number.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", str(value))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", ""))
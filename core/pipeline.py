@@ -0,0 +1,280 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from core.history import shift_fingerprint, utc_now
+from core.metrics import Metrics
+from core.shift import Shift
+
+@dataclass
+class AgencyDone:
+    """
+    Marker sent down the pipeline once an agency has finished. Shifts
+    before it are all of that agency's run; `complete` says whether the
+    run can expire shifts that were not seen. `reused` are stored shifts
+    whose listing rows were unchanged (never sent as shifts), `listing`
+    the run's (fingerprint, {row hash: shift id}) for the listing memo.
+    """
+    agency: str
+    status: str
+    complete: bool
+    reused: set = field(default_factory=set)
+    listing: tuple = None
+
+_END = object()
+
+class PipelineError(RuntimeError):
+    """
+    A pipeline stage has stopped, so nothing would ever read what is put in.
+    """
+
+class ShiftPipeline:
+    """
+    Streams shifts from the scrapers into storage while agencies are still
+    running:
+
+        put() -> normalize -> geocode -> dedupe -> persist
+
+    Stages are tasks joined by bounded queues, so a slow stage (Nominatim,
+    the database) makes the scrapers wait instead of buffering everything.
+    Geocoding works on micro-batches: up to `batch_size` shifts, or whatever
+    arrived within `batch_wait` seconds.
+
+    With a ListingMemo, each complete agency run is recorded in it once its
+    shifts are stored, so the next run only processes the listing's delta.
+    With a RateAnalytics, every stored batch is queued for its incremental
+    rate aggregates.
+    """
+    def __init__(self, store, geo, queue_size=200, batch_size=50, batch_wait=0.5, listing_memo=None, analytics=None):
+        self.store = store
+        self.geo = geo
+        self.listing_memo = listing_memo
+        self.analytics = analytics
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.now = utc_now()
+        self._queues = [asyncio.Queue(maxsize=queue_size) for _ in range(4)]
+        self._tasks = []
+        # Per agency: fingerprints passed by dedupe, and fingerprints persisted
+        self._seen = {}
+        self._current = {}
+        # Per agency: persisted fingerprints that have coordinates (safe to reuse next run)
+        self._located = {}
+        self.stats = {}
+        self.counts = {"received": 0, "duplicates": 0, "geocoded": 0, "persisted": 0}
+        self.metrics = Metrics.shared()
+
+    async def __aenter__(self):
+        normalize_in, geocode_in, dedupe_in, persist_in = self._queues
+        self._tasks = [
+            asyncio.create_task(self._normalize(normalize_in, geocode_in)),
+            asyncio.create_task(self._geocode(geocode_in, dedupe_in)),
+            asyncio.create_task(self._dedupe(dedupe_in, persist_in)),
+            asyncio.create_task(self._persist(persist_in)),
+        ]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self._enqueue(_END)
+            await asyncio.gather(*self._tasks)
+        else:
+            for task in self._tasks:
+                task.cancel()
+            for result in await asyncio.gather(*self._tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"   Pipeline stage failed: {result!r}")
+        for key, value in self.counts.items():
+            self.metrics.count(f"pipeline_{key}", value)
+        print(f"Pipeline: {self.counts['received']} received, {self.counts['duplicates']} duplicates dropped, "
+              f"{self.counts['geocoded']} geocoded, {self.counts['persisted']} persisted")
+
+    async def put(self, shift):
+        self.counts["received"] += 1
+        await self._enqueue(shift)
+
+    async def finish_agency(self, agency, status, reused=(), listing=None):
+        await self._enqueue(AgencyDone(agency, status, complete=status == "ok",
+                                       reused=set(reused), listing=listing))
+
+    def _check_stages(self):
+        # Stages only return after _END, so a finished task before that means a crashed stage
+        for task in self._tasks:
+            if task.done():
+                error = None if task.cancelled() else task.exception()
+                raise PipelineError(f"Shift pipeline stage stopped: {error!r}") from error
+
+    async def _enqueue(self, item):
+        self._check_stages()
+        inbox = self._queues[0]
+        if not inbox.full():
+            inbox.put_nowait(item)
+            return
+        # Queue is full: wait for room, but give up if a stage dies meanwhile
+        put = asyncio.ensure_future(inbox.put(item))
+        try:
+            await asyncio.wait([put, *self._tasks], return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            # e.g. the agency's deadline; the shift must not be delivered afterwards
+            put.cancel()
+            raise
+        if not put.done():
+            put.cancel()
+            self._check_stages()
+
+    # --- Stages ---
+
+    async def _normalize(self, inbox, outbox):
+        while True:
+            item = await inbox.get()
+            if isinstance(item, Shift):
+                item.normalize()
+            await outbox.put(item)
+            if item is _END:
+                return
+
+    async def _geocode(self, inbox, outbox):
+        batch = []
+        while True:
+            if batch:
+                # An open batch is sent after batch_wait even if it is not full. asyncio.wait,
+                # unlike wait_for, never turns a cancellation at the deadline into a timeout.
+                get = asyncio.ensure_future(inbox.get())
+                try:
+                    done, _ = await asyncio.wait([get], timeout=self.batch_wait)
+                except asyncio.CancelledError:
+                    get.cancel()
+                    raise
+                if not done:
+                    get.cancel()
+                    await self._geocode_batch(batch, outbox)
+                    batch = []
+                    continue
+                item = get.result()
+            else:
+                item = await inbox.get()
+
+            if isinstance(item, Shift):
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    await self._geocode_batch(batch, outbox)
+                    batch = []
+                continue
+
+            # Markers keep their place behind the shifts sent before them
+            await self._geocode_batch(batch, outbox)
+            batch = []
+            await outbox.put(item)
+            if item is _END:
+                return
+
+    async def _geocode_batch(self, batch, outbox):
+        if not batch:
+            return
+        try:
+            with self.metrics.span("geocode_batch") as span:
+                await self.geo.fill_coordinates(batch, report=False)
+                span.count("shifts", len(batch))
+            self.counts["geocoded"] += sum(1 for s in batch if s.lat is not None)
+        except Exception as e:
+            # Shifts still get stored; the next run fills in their coordinates
+            print(f"   Geocoding batch of {len(batch)} failed: {e}")
+        for shift in batch:
+            await outbox.put(shift)
+
+    async def _dedupe(self, inbox, outbox):
+        # The same shift can be listed twice in one run (API and DOM paths, repeated pages)
+        while True:
+            item = await inbox.get()
+            if isinstance(item, Shift):
+                record = item.to_dict()
+                fingerprint = shift_fingerprint(record)
+                seen = self._seen.setdefault(item.agency, set())
+                if fingerprint in seen:
+                    self.counts["duplicates"] += 1
+                    continue
+                seen.add(fingerprint)
+                await outbox.put((fingerprint, record))
+                continue
+            if isinstance(item, AgencyDone):
+                self._seen.pop(item.agency, None)
+            await outbox.put(item)
+            if item is _END:
+                return
+
+    async def _persist(self, inbox):
+        pending = {}
+        while True:
+            item = await inbox.get()
+            if isinstance(item, tuple):
+                fingerprint, record = item
+                self._current.setdefault(record['agency'], set()).add(fingerprint)
+                if record.get('lat') is not None:
+                    self._located.setdefault(record['agency'], set()).add(fingerprint)
+                batch = pending.setdefault(record['agency'], [])
+                batch.append(record)
+                # Write whenever the queue has been drained, so shifts land as they arrive
+                if len(batch) >= self.batch_size or inbox.empty():
+                    self._write(record['agency'], pending.pop(record['agency']))
+                continue
+
+            if item is _END:
+                for agency, batch in pending.items():
+                    self._write(agency, batch)
+                self.store.commit()
+                return
+
+            self._write(item.agency, pending.pop(item.agency, []))
+            try:
+                self._finish(item)
+            except Exception as e:
+                # Same as a failed write: the agency's old shifts stay as they were
+                print(f"   Could not finish {item.agency}: {e}")
+
+    def _write(self, agency, records):
+        if not records:
+            return
+        started = time.monotonic()
+        try:
+            with self.metrics.span("persist", agency=agency) as span:
+                stats = self.store.upsert(agency, records, self.now)
+                span.count("records", len(records))
+        except Exception as e:
+            print(f"   Could not store {len(records)} {agency} shifts: {e}")
+            return
+        totals = self.stats.setdefault(agency, {"new": 0, "changed": 0, "seen": 0, "expired": 0, "write_s": 0.0})
+        for key in ("new", "changed", "seen"):
+            totals[key] += stats[key]
+        totals["write_s"] += time.monotonic() - started
+        self.counts["persisted"] += len(records)
+        if self.analytics is not None:
+            self.analytics.add(dict(record, id=shift_fingerprint(record)) for record in records)
+
+    def _finish(self, done):
+        totals = self.stats.setdefault(done.agency, {"new": 0, "changed": 0, "seen": 0, "expired": 0, "write_s": 0.0})
+        current = self._current.setdefault(done.agency, set())
+        if done.reused:
+            found = self.store.touch(done.agency, done.reused, self.now)
+            current.update(found)
+            totals["seen"] += len(found)
+            missing = done.reused - found
+            if missing:
+                # Store no longer has them (e.g. a new database); forgetting the rows re-extracts them next run
+                print(f"   {len(missing)} reused {done.agency} shifts are missing from the store")
+                if self.listing_memo is not None:
+                    self.listing_memo.forget(done.agency, missing)
+        if done.complete:
+            with self.metrics.span("expire", agency=done.agency):
+                totals["expired"] = self.store.expire(done.agency, self._current.get(done.agency, set()), self.now)
+        for key in ("new", "changed", "seen", "expired"):
+            self.metrics.count(f"shifts_{key}", totals[key], agency=done.agency)
+        located = self._located.pop(done.agency, set())
+        if done.complete and done.listing and self.listing_memo is not None:
+            # Only rows whose shift is stored with coordinates; the rest are processed again next run
+            keep = current & (located | done.reused)
+            fingerprint, rows = done.listing
+            self.listing_memo.record(done.agency, fingerprint, {h: i for h, i in rows.items() if i in keep})
+        self._current.pop(done.agency, None)
+        self.store.commit()
+        print(f"   {done.agency}: {totals['new']} new, {totals['changed']} changed, "
+              f"{totals['seen']} unchanged, {totals['expired']} expired"
+              f"{'' if done.complete else f' ({done.status}, nothing expired)'}")
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from core.metrics import Metrics
+
+class AgencyRunner:
+    """
+    Runs a set of scrapers concurrently with a shared concurrency limit
+    and a per-agency deadline.
+    """
+    def __init__(self, max_concurrency=3, default_timeout=300):
+        self.max_concurrency = max(1, int(max_concurrency or 1))
+        self.default_timeout = default_timeout
+        self.results = []
+
+    async def _drain(self, scraper, pipeline):
+        async for shift in scraper.stream():
+            if pipeline is not None:
+                await pipeline.put(shift)
+
+    async def _run_one(self, key, scraper, timeout, semaphore, pipeline=None):
+        async with semaphore:
+            started = time.monotonic()
+            status = "ok"
+            with Metrics.shared().span("scrape", agency=scraper.agency_name) as span:
+                try:
+                    await asyncio.wait_for(self._drain(scraper, pipeline), timeout=timeout)
+                    if getattr(scraper, 'failed', False):
+                        status = "error"
+                except asyncio.TimeoutError:
+                    # The scraper's own finally block has closed the browser by now.
+                    # Everything it extracted before the deadline is already downstream.
+                    status = "timeout"
+                    print(f"Timeout in {key} after {timeout}s (kept {len(scraper.shifts)} partial shifts)")
+                except Exception as e:
+                    status = "error"
+                    print(f"Critical failure in {key}: {e}")
+                span.status = status
+                span.count("shifts", len(scraper.shifts))
+
+            if pipeline is not None:
+                await pipeline.finish_agency(scraper.agency_name, status, scraper.reused,
+                                             (scraper.listing_fingerprint, scraper.listing_rows))
+
+            return {
+                "key": key,
+                "agency": scraper.agency_name,
+                "status": status,
+                "shifts": list(scraper.shifts),
+                "elapsed": time.monotonic() - started,
+            }
+
+    async def run(self, jobs, pipeline=None):
+        """
+        jobs: list of (key, scraper, timeout) tuples. timeout may be None to
+        use the runner default.
+        pipeline: optional ShiftPipeline that receives each shift as it is
+        extracted, followed by an end-of-agency marker.
+        Yields each agency's result dict as soon as that agency finishes.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.create_task(self._run_one(key, scraper, timeout or self.default_timeout, semaphore, pipeline))
+            for key, scraper, timeout in jobs
+        ]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                self.results.append(result)
+                print(f"Finished {result['key']} [{result['status']}] "
+                      f"{len(result['shifts'])} shifts in {result['elapsed']:.1f}s")
+                yield result
+        finally:
+            # A failed run (e.g. a stopped pipeline) must not leave other agencies running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,70 @@
+import base64
+import hashlib
+import json
+import os
+import re
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+class SessionStore:
+    """
+    Saves Playwright storage_state (cookies + localStorage) per agency,
+    encrypted at rest with a key taken from the SESSION_KEY env var.
+    Without a key (or without the cryptography package) persistence is
+    disabled and every run logs in from scratch.
+    """
+    def __init__(self, directory='data/sessions', secret=None):
+        self.directory = directory
+        secret = secret if secret is not None else os.environ.get('SESSION_KEY')
+        self.fernet = None
+
+        if secret and Fernet is not None:
+            # Accept any passphrase by stretching it to a valid 32-byte Fernet key
+            key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode('utf-8')).digest())
+            self.fernet = Fernet(key)
+
+    @property
+    def enabled(self):
+        return self.fernet is not None
+
+    def _path(self, name):
+        slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+        return os.path.join(self.directory, f"{slug}.session")
+
+    def load(self, name):
+        """
+        Returns the stored storage_state dict for an agency, or None.
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                return json.loads(self.fernet.decrypt(f.read()))
+        except (InvalidToken, ValueError, OSError):
+            # Wrong key or corrupted file - treat as no session
+            self.discard(name)
+            return None
+
+    def save(self, name, state):
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.fernet.encrypt(json.dumps(state).encode('utf-8')))
+        os.replace(tmp_path, path)
+
+    def discard(self, name):
+        path = self._path(name)
+        if os.path.exists(path):
+            os.remove(path)
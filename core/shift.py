@@ -0,0 +1,183 @@
+import re
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from core.parsing import DATE_FORMATS, TIME_FORMATS, clean_date_text, parse_amount
+
+_RANGE_SPLIT = re.compile(r"\s*(?:-|–|to)\s*")
+
+@dataclass(slots=True)
+class Shift:
+    """
+    One listed shift, parsed once when it is scraped.
+
+    date / time / rate keep the text exactly as the agency lists it (it is
+    what the map shows and what history fingerprints are built from);
+    everything else is already numeric or a real date.
+    """
+    agency: str
+    company: str = "Unknown"
+    location: str = ""
+    postcode: str = ""
+    date: str = ""
+    time: str = ""
+    rate: str = ""
+    link: str = ""
+    shift_id: str = ""
+    lat: float = None
+    lon: float = None
+    day: date = None
+    start: str = None          # "HH:MM", 24h
+    end: str = None
+    hours: float = None
+    rate_value: float = None   # the listed rate as a number
+    rate_unit: str = None      # "hour" or "day"
+    total: float = None        # pay for the whole shift
+
+    def normalize(self):
+        """
+        Canonical company and postcode text ("sw1a1aa" -> "SW1A 1AA").
+        Location, date and time are left as listed: they make up the
+        history fingerprint.
+        """
+        self.company = " ".join(self.company.split()) or "Unknown"
+        postcode = "".join(self.postcode.split()).upper()
+        # The inward code is always the last three characters of a full postcode
+        self.postcode = f"{postcode[:-3]} {postcode[-3:]}" if len(postcode) > 4 else postcode
+        return self
+
+    def to_dict(self):
+        record = {f.name: getattr(self, f.name) for f in fields(self)}
+        record['day'] = self.day.isoformat() if self.day else None
+        return record
+
+    @classmethod
+    def from_dict(cls, record):
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in record.items() if k in known}
+        if isinstance(values.get('day'), str):
+            values['day'] = date.fromisoformat(values['day'])
+        if values.get('total') is not None and not isinstance(values['total'], float):
+            values['total'] = parse_amount(values['total'])
+        return cls(**values)
+
+def as_record(shift):
+    """
+    Plain dict for storage, whether given a Shift or an already-plain record.
+    """
+    return shift.to_dict() if isinstance(shift, Shift) else shift
+
+class ShiftParser:
+    """
+    Per-agency text parser. Each agency formats dates and times its own way,
+    so the first format that works is remembered and tried first for every
+    later row; parsed values are memoised since listings repeat them a lot.
+    """
+    def __init__(self, agency, rate_unit='day'):
+        self.agency = agency
+        self.default_unit = rate_unit
+        self._date_format = None
+        self._time_format = None
+        self._dates = {}
+        self._times = {}
+
+    def _strptime(self, text, formats, preferred):
+        if preferred:
+            try:
+                return datetime.strptime(text, preferred), preferred
+            except ValueError:
+                pass
+        for fmt in formats:
+            try:
+                return datetime.strptime(text, fmt), fmt
+            except ValueError:
+                continue
+        return None, None
+
+    def parse_date(self, text):
+        if not text:
+            return None
+        if text not in self._dates:
+            parsed, fmt = self._strptime(clean_date_text(text), DATE_FORMATS, self._date_format)
+            if fmt:
+                self._date_format = fmt
+            self._dates[text] = parsed.date() if parsed else None
+        return self._dates[text]
+
+    def _parse_clock(self, text):
+        text = text.strip().upper().replace(".", ":")
+        parsed, fmt = self._strptime(text, TIME_FORMATS, self._time_format)
+        if fmt:
+            self._time_format = fmt
+        return parsed
+
+    def parse_time(self, text):
+        """
+        (start "HH:MM", end "HH:MM", hours) from "2:00 PM - 4:00 PM", "09:00 - 17:30", ...
+        """
+        if not text:
+            return None, None, None
+        if text not in self._times:
+            parts = _RANGE_SPLIT.split(str(text).strip(), maxsplit=1)
+            start = self._parse_clock(parts[0]) if parts[0] else None
+            end = self._parse_clock(parts[1]) if len(parts) > 1 and parts[1] else None
+            hours = None
+            if start and end:
+                minutes = (end - start).seconds // 60  # wraps past midnight
+                hours = round(minutes / 60, 2) or None
+            self._times[text] = (
+                start.strftime("%H:%M") if start else None,
+                end.strftime("%H:%M") if end else None,
+                hours
+            )
+        return self._times[text]
+
+    def parse_rate(self, rate_text, total_text=None, hours=None):
+        """
+        (rate_value, rate_unit, total). The unit comes from the text
+        ("/hr", "/day") or the agency default; the total is the listed one
+        or, failing that, derived from the rate.
+        """
+        rate_value = parse_amount(rate_text)
+        lowered = str(rate_text or "").lower()
+        if "/hr" in lowered or "hour" in lowered or "ph" in lowered.split():
+            unit = "hour"
+        elif "/day" in lowered or "day" in lowered:
+            unit = "day"
+        else:
+            unit = self.default_unit
+
+        total = parse_amount(total_text)
+        # A missing or placeholder "0" total is worked out from the rate
+        if not total and rate_value is not None:
+            if unit == "day":
+                total = rate_value
+            elif hours:
+                total = round(rate_value * hours, 2)
+        return rate_value, unit, total
+
+    def build(self, raw):
+        """
+        Shift from a scraper's raw dict (date/time/rate/total as listed text).
+        """
+        start, end, hours = self.parse_time(raw.get('time'))
+        rate_value, rate_unit, total = self.parse_rate(raw.get('rate'), raw.get('total'), hours)
+        return Shift(
+            agency=raw.get('agency') or self.agency,
+            company=raw.get('company') or "Unknown",
+            location=(raw.get('location') or "").strip(),
+            postcode=raw.get('postcode') or "",
+            date=raw.get('date') or "",
+            time=raw.get('time') or "",
+            rate=raw.get('rate') or "",
+            link=raw.get('link') or "",
+            shift_id=raw.get('shift_id') or "",
+            lat=raw.get('lat'),
+            lon=raw.get('lon'),
+            day=self.parse_date(raw.get('date')),
+            start=start,
+            end=end,
+            hours=hours,
+            rate_value=rate_value,
+            rate_unit=rate_unit,
+            total=total
+        )
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import tempfile
+from core.geoutils import geohash_cells, geohash_encode, haversine_km, radius_bbox
+from core.parsing import parse_amount, parse_date
+
+# Columns of each indexed shift, in order
+INDEX_FIELDS = ("id", "lat", "lon", "day", "total", "agencies", "company", "location", "postcode", "time", "link")
+
+class ShiftIndex:
+    """
+    Geohash bucket index over the coordinates of the active shifts (the
+    canonical ones, see core.duplicates, so a shift several agencies list
+    is one row), built once per run and saved next to the history
+    (data/shift_index.json):
+
+        {"precision": 4, "hash": "...", "fields": [...], "buckets": {"gcqr": [[id, lat, lon, ...], ...]}}
+
+    Buckets and their rows are sorted and `hash` is derived from them, so
+    the file only changes when the indexed shifts do.
+
+    A radius query only reads the buckets overlapping the circle's bounding
+    box, then filters those shifts by exact distance, date and pay.
+
+        index = ShiftIndex.load()
+        index.query(53.26, -1.91, radius_km=40, date_from='2026-03-01', min_total=300)
+        index.near("SK17", 40, UKGeocoder(), sort='total')
+    """
+    def __init__(self, buckets=None, precision=4):
+        # Precision 4 cells are ~39 x 20 km, so a typical radius touches a dozen buckets
+        self.buckets = buckets or {}
+        self.precision = precision
+
+    @property
+    def digest(self):
+        payload = json.dumps([self.precision, self.buckets], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def build(cls, shifts, precision=4):
+        buckets = {}
+        for shift in shifts:
+            lat, lon = shift.get('lat'), shift.get('lon')
+            if lat is None or lon is None:
+                continue
+            # Records from before typed shifts only carry the listed date text
+            day = shift.get('day') or parse_date(shift.get('date'))
+            row = [
+                shift.get('id'), lat, lon,
+                str(day) if day else None,
+                parse_amount(shift.get('total')),
+                shift.get('agencies') or [shift.get('agency')], shift.get('company'), shift.get('location'),
+                shift.get('postcode'), shift.get('time'), shift.get('link'),
+            ]
+            buckets.setdefault(geohash_encode(lat, lon, precision), []).append(row)
+        for rows in buckets.values():
+            rows.sort(key=lambda row: row[0] or "")
+        return cls(dict(sorted(buckets.items())), precision)
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.buckets.values())
+
+    @classmethod
+    def load(cls, path='data/shift_index.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if tuple(data.get("fields", ())) != INDEX_FIELDS:
+            raise ValueError(f"{path} was built with different fields; rebuild it with a run of main.py")
+        return cls(data["buckets"], data["precision"])
+
+    def save(self, path='data/shift_index.json'):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        data = {"precision": self.precision, "hash": self.digest, "fields": INDEX_FIELDS, "buckets": self.buckets}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.index-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def near(self, place, radius_km, geocoder, **filters):
+        """
+        query() around a postcode or town, resolved with `geocoder` (a
+        UKGeocoder). Returns None when the place cannot be found.
+        """
+        lat, lon = geocoder.get_lat_lon(place)
+        if lat is None:
+            return None
+        return self.query(lat, lon, radius_km, **filters)
+
+    def query(self, lat, lon, radius_km, date_from=None, date_to=None, min_total=None, sort='distance', limit=None):
+        """
+        Shifts within `radius_km` of (lat, lon), as dicts with a `distance_km`.
+        date_from / date_to: datetime.date or ISO string, inclusive
+        min_total: minimum total pay
+        sort: 'distance' (nearest first) or 'total' (best paid first)
+        """
+        date_from = str(date_from) if date_from else None
+        date_to = str(date_to) if date_to else None
+        results = []
+        for cell in geohash_cells(*radius_bbox(lat, lon, radius_km), self.precision):
+            for row in self.buckets.get(cell, ()):
+                day, total = row[3], row[4]
+                if date_from and (day is None or day < date_from):
+                    continue
+                if date_to and (day is None or day > date_to):
+                    continue
+                if min_total is not None and (total or 0) < min_total:
+                    continue
+                distance = haversine_km(lat, lon, row[1], row[2])
+                if distance <= radius_km:
+                    results.append(dict(zip(INDEX_FIELDS, row), distance_km=round(distance, 2)))
+
+        if sort == 'total':
+            results.sort(key=lambda r: (-(r['total'] or 0), r['distance_km']))
+        else:
+            results.sort(key=lambda r: (r['distance_km'], r['day'] or ''))
+        return results[:limit] if limit else results
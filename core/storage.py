@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import tempfile
+from core.geoutils import geohash_cover, geohash_encode
+from core.history import TRACKED_FIELDS, ShiftHistory, load_legacy, shift_fingerprint, utc_now
+from core.parsing import parse_amount, parse_date
+from core.shift import as_record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    id TEXT PRIMARY KEY,
+    agency TEXT NOT NULL,
+    status TEXT NOT NULL,
+    shift_date TEXT,
+    geohash TEXT,
+    total REAL,
+    lat REAL,
+    lon REAL,
+    first_seen TEXT,
+    last_seen TEXT,
+    expired_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shifts_agency ON shifts(agency, status);
+CREATE INDEX IF NOT EXISTS idx_shifts_date ON shifts(shift_date);
+CREATE INDEX IF NOT EXISTS idx_shifts_geohash ON shifts(geohash);
+CREATE INDEX IF NOT EXISTS idx_shifts_total ON shifts(total);
+"""
+
+class SqliteShiftStore:
+    """
+    Shift history in an indexed SQLite file, same interface as ShiftHistory.
+
+    The full shift record is kept as JSON in `data`; the columns beside it
+    are derived once on write (ISO date, geohash, numeric total pay) so that
+    query() can use indexes instead of loading everything.
+
+    The database is a cache: export() writes every record, one sorted JSON
+    line each, to `export_path`, which is the copy kept in git (it diffs
+    line by line). last_seen is left out of it, since it changes for every
+    active shift on every run. An empty database is rebuilt from that
+    export, or else imported from an older history file. Source files are
+    never deleted.
+    """
+    def __init__(self, path='data/history.db', import_from=('data/history.jsonl', 'data/history.json'),
+                 export_path='data/shifts.jsonl'):
+        self.path = path
+        self.export_path = export_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(shifts)")}
+        if 'rate_value' in columns:
+            # Cached databases from before the column was named for what it holds (the total pay)
+            self.conn.execute("DROP INDEX IF EXISTS idx_shifts_rate")
+            self.conn.execute("ALTER TABLE shifts RENAME COLUMN rate_value TO total")
+        self.conn.executescript(SCHEMA)
+
+        if self.conn.execute("SELECT COUNT(*) FROM shifts").fetchone()[0] == 0:
+            if export_path and os.path.exists(export_path):
+                self._load_export()
+            elif import_from:
+                self._migrate(import_from)
+
+    def _insert(self, records, source):
+        with self.conn:
+            self.conn.executemany(self._UPSERT, [self._row(r) for r in records])
+        print(f"Imported {len(records)} shifts from {source} into {self.path}")
+
+    def _load_export(self):
+        records = []
+        with open(self.export_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    # Not exported; the latest date known for sure is when it expired or was first seen
+                    record['last_seen'] = record.get('expired_at') or record.get('first_seen')
+                    records.append(record)
+        self._insert(records, self.export_path)
+
+    def _migrate(self, paths):
+        # Import whichever older history file exists: the JSONL log or the original JSON array.
+        # The file is left in place; the export written at the end of the run supersedes it.
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            if path.endswith('.jsonl'):
+                records = ShiftHistory(path, legacy_path=None).all_shifts()
+            else:
+                records = load_legacy(path)
+            self._insert(records, path)
+            return
+
+    def export(self):
+        """
+        Writes every shift except its last_seen to `export_path` as JSON
+        Lines sorted by id, so only a night's new, changed and expired
+        shifts show up as changed lines.
+        """
+        if not self.export_path:
+            return
+        directory = os.path.dirname(self.export_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.shifts-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for row in self.conn.execute("SELECT * FROM shifts ORDER BY id"):
+                record = self._record(row)
+                record.pop('last_seen', None)
+                f.write(json.dumps(record, sort_keys=True, separators=(',', ':')) + "\n")
+        os.replace(tmp_path, self.export_path)
+
+    _UPSERT = """
+        INSERT INTO shifts (id, agency, status, shift_date, geohash, total, lat, lon,
+                            first_seen, last_seen, expired_at, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            agency=excluded.agency, status=excluded.status, shift_date=excluded.shift_date,
+            geohash=excluded.geohash, total=excluded.total, lat=excluded.lat, lon=excluded.lon,
+            first_seen=excluded.first_seen, last_seen=excluded.last_seen,
+            expired_at=excluded.expired_at, data=excluded.data
+    """
+
+    @staticmethod
+    def _row(record):
+        lat, lon = record.get('lat'), record.get('lon')
+        # Records from before typed shifts only carry the listed date text
+        shift_date = record.get('day') or parse_date(record.get('date'))
+        return (
+            record['id'],
+            record.get('agency') or '',
+            record.get('status', 'active'),
+            str(shift_date) if shift_date else None,
+            geohash_encode(lat, lon) if lat is not None and lon is not None else None,
+            parse_amount(record.get('total')),
+            lat,
+            lon,
+            record.get('first_seen'),
+            record.get('last_seen'),
+            record.get('expired_at'),
+            json.dumps(record, separators=(',', ':')),
+        )
+
+    @staticmethod
+    def _record(row):
+        record = json.loads(row['data'])
+        # Columns are the source of truth for the fields updated in place
+        record.update(status=row['status'], last_seen=row['last_seen'])
+        record.pop('expired_at', None)
+        if row['expired_at']:
+            record['expired_at'] = row['expired_at']
+        return record
+
+    def _fetch(self, ids):
+        found = {}
+        ids = list(ids)
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            sql = f"SELECT * FROM shifts WHERE id IN ({','.join('?' * len(chunk))})"
+            for row in self.conn.execute(sql, chunk):
+                found[row['id']] = self._record(row)
+        return found
+
+    def merge(self, agency, shifts, complete=True, now=None):
+        """
+        Same contract as ShiftHistory.merge: upserts new/changed shifts,
+        bumps last_seen on unchanged ones and, for complete runs, expires
+        the agency's active shifts that were not seen.
+        """
+        now = now or utc_now()
+        shifts = [as_record(s) for s in shifts]
+        stats = self.upsert(agency, shifts, now)
+        stats["expired"] = self.expire(agency, {shift_fingerprint(s) for s in shifts}, now) if complete else 0
+        return stats
+
+    def upsert(self, agency, shifts, now=None):
+        """
+        Writes a batch of one agency's shifts in one transaction, without
+        expiring anything. Returns new / changed / seen counts.
+        """
+        now = now or utc_now()
+        stats = {"new": 0, "changed": 0, "seen": 0}
+        by_id = {shift_fingerprint(s): s for s in map(as_record, shifts)}
+        existing = self._fetch(by_id)
+
+        upserts, seen_ids = [], []
+        for shift_id, shift in by_id.items():
+            old = existing.get(shift_id)
+            if old is None:
+                upserts.append(dict(shift, id=shift_id, first_seen=now, last_seen=now, status="active"))
+                stats["new"] += 1
+            elif any(old.get(k) != shift.get(k) for k in TRACKED_FIELDS if k in shift):
+                record = dict(old, **shift, last_seen=now, status="active")
+                record.pop('expired_at', None)
+                upserts.append(record)
+                stats["changed"] += 1
+            else:
+                seen_ids.append(shift_id)
+
+        with self.conn:
+            self.conn.executemany(self._UPSERT, [self._row(r) for r in upserts])
+            self.conn.executemany(
+                "UPDATE shifts SET last_seen = ?, status = 'active', expired_at = NULL WHERE id = ?",
+                [(now, i) for i in seen_ids]
+            )
+        stats["seen"] = len(seen_ids)
+        return stats
+
+    def touch(self, agency, ids, now=None):
+        """
+        Bumps last_seen on stored shifts that were listed unchanged, without
+        rewriting them. Returns the ids that were found.
+        """
+        found, ids = set(), list(ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            sql = f"SELECT id FROM shifts WHERE id IN ({','.join('?' * len(chunk))})"
+            found.update(row['id'] for row in self.conn.execute(sql, chunk))
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE shifts SET last_seen = ?, status = 'active', expired_at = NULL WHERE id = ?",
+                [(now or utc_now(), i) for i in found]
+            )
+        return found
+
+    def expire(self, agency, current_ids, now=None):
+        """
+        Expires the agency's active shifts whose fingerprint is not in
+        `current_ids`. Returns how many.
+        """
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_ids (id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM current_ids")
+            self.conn.executemany("INSERT OR IGNORE INTO current_ids VALUES (?)", [(i,) for i in current_ids])
+            cursor = self.conn.execute(
+                """UPDATE shifts SET status = 'expired', expired_at = ?
+                   WHERE agency = ? AND status = 'active' AND id NOT IN (SELECT id FROM current_ids)""",
+                (now or utc_now(), agency)
+            )
+        return cursor.rowcount
+
+    def commit(self):
+        # merge() commits its own transaction; kept for interface parity with ShiftHistory
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def active_shifts(self):
+        return self.query()
+
+    def all_shifts(self):
+        return self.query(status=None)
+
+    def query(self, date_from=None, date_to=None, agency=None, bbox=None, min_total=None, status='active'):
+        """
+        Shifts matching every given filter.
+        date_from / date_to: datetime.date or ISO string, inclusive
+        agency: agency name
+        bbox: (min_lat, min_lon, max_lat, max_lon)
+        min_total: minimum total pay
+        status: 'active', 'expired' or None for both
+        """
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if agency:
+            where.append("agency = ?")
+            params.append(agency)
+        if date_from:
+            where.append("shift_date >= ?")
+            params.append(str(date_from))
+        if date_to:
+            where.append("shift_date <= ?")
+            params.append(str(date_to))
+        if min_total is not None:
+            where.append("total >= ?")
+            params.append(min_total)
+        if bbox:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            # Geohash prefix ranges use the index; the exact box check trims the cell edges
+            prefixes = geohash_cover(min_lat, min_lon, max_lat, max_lon)
+            where.append("(" + " OR ".join("(geohash >= ? AND geohash < ?)" for _ in prefixes) + ")")
+            for prefix in prefixes:
+                params.extend([prefix, prefix + "~"])
+            where.append("lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+            params.extend([min_lat, max_lat, min_lon, max_lon])
+
+        sql = "SELECT * FROM shifts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY shift_date, agency"
+        return [self._record(row) for row in self.conn.execute(sql, params)]
+
+def open_store(path='data/history.db', export_path='data/shifts.jsonl'):
+    """
+    Storage backend chosen by file extension: .db for SQLite (with its text
+    export at `export_path`), .jsonl for the append-only log.
+    """
+    if path.endswith('.jsonl'):
+        return ShiftHistory(path)
+    return SqliteShiftStore(path, export_path=export_path)
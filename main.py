@@ -1,12 +1,41 @@
 import asyncio
-import json
 import os
+import time
 import yaml
 from scrapers.locatealocum import LocateALocumScraper
 from scrapers.locumbell import LocumbellScraper
 from scrapers.locumotive import LocumotiveScraper
 from scrapers.teamlocum import TeamLocumScraper
+from core.browser import BrowserManager
 from core.generator import MapGenerator
+from core.metrics import Metrics
+from core.analytics import RateAnalytics
+from core.duplicates import link_duplicates
+from core.geoservice import GeocodingService
+from core.listing import ListingMemo
+from core.pipeline import ShiftPipeline
+from core.storage import open_store
+from core.runner import AgencyRunner
+from core.spatial import ShiftIndex
+
+def build_scraper(key, agency_conf, secrets, browser_manager=None, listing_memo=None):
+    # Merge secrets with agency specific config
+    agency_secrets = secrets.copy()
+    agency_secrets['LOGIN_URL'] = agency_conf.get('login_url')
+    agency_secrets['AGENCY_NAME'] = agency_conf.get('name')
+
+    # Factory Pattern
+    impl = agency_conf.get('implementation', key) # Default to key name
+
+    if key == 'locatealocum':
+        return LocateALocumScraper(agency_secrets, browser_manager, config=agency_conf, listing_memo=listing_memo)
+    elif impl == 'locumbell':
+        return LocumbellScraper(agency_secrets, browser_manager, config=agency_conf, listing_memo=listing_memo)
+    elif key == 'locumotive':
+        return LocumotiveScraper(agency_secrets, browser_manager, config=agency_conf, listing_memo=listing_memo)
+    elif key == 'teamlocum':
+        return TeamLocumScraper(agency_secrets, browser_manager, config=agency_conf, listing_memo=listing_memo)
+    return None
 
 async def main():
     print("Starting Daily Scrape...")
@@ -31,52 +60,85 @@ async def main():
         "TEAMLOCUM_PASS": os.environ.get("TEAMLOCUM_PASS"),
     }
 
-    all_shifts = []
+    # 3. Dynamic Runner (agencies run concurrently, bounded by runner settings)
+    runner_conf = config.get('runner') or {}
+    runner = AgencyRunner(
+        max_concurrency=runner_conf.get('max_concurrency', 3),
+        default_timeout=runner_conf.get('agency_timeout', 300)
+    )
+
+    # One Chromium for the whole run, one isolated context per agency
+    browser_manager = BrowserManager()
 
-    # 3. Dynamic Runner
+    # Each agency's listing as of its last complete run; only new or changed rows get processed
+    storage_conf = config.get('storage') or {}
+    listing_memo = ListingMemo(storage_conf.get('listings', 'data/listings.json'))
+
+    jobs = []
     for key, agency_conf in config['agencies'].items():
         if not agency_conf.get('enabled'):
             print(f"Skipping {key} (Disabled)")
             continue
 
-        scraper = None
-        
-        # Merge secrets with agency specific config
-        agency_secrets = secrets.copy()
-        agency_secrets['LOGIN_URL'] = agency_conf.get('login_url')
-        agency_secrets['AGENCY_NAME'] = agency_conf.get('name')
-
-        # Factory Pattern
-        impl = agency_conf.get('implementation', key) # Default to key name
-        
-        if key == 'locatealocum':
-            scraper = LocateALocumScraper(agency_secrets)
-        elif impl == 'locumbell':
-            scraper = LocumbellScraper(agency_secrets)
-        elif key == 'locumotive':
-            scraper = LocumotiveScraper(agency_secrets)
-        elif key == 'teamlocum':
-            scraper = TeamLocumScraper(agency_secrets)
-
+        scraper = build_scraper(key, agency_conf, secrets, browser_manager, listing_memo)
         if scraper:
-            try:
-                shifts = await scraper.run()
-                all_shifts.extend(shifts)
-            except Exception as e:
-                print(f"Critical failure in {key}: {e}")
-
-    # 4. Save to History (Simple overwrite for now, Merge logic comes next)
-    print(f"Scrape Complete. Total shifts: {len(all_shifts)}")
-    
-    # Ensure directory exists
-    os.makedirs('data', exist_ok=True)
-    
-    with open('data/history.json', 'w') as f:
-        json.dump(all_shifts, f, indent=2)
+            jobs.append((key, scraper, agency_conf.get('timeout')))
 
-    # 5. Generate Map HTML
-    gen = MapGenerator(output_file='index.html')
+    # 4. Stream every shift through normalize -> geocode -> dedupe -> persist as it is
+    #    extracted (agencies that fail or time out keep their old shifts)
+    history = open_store(storage_conf.get('path', 'data/history.db'), storage_conf.get('export', 'data/shifts.jsonl'))
+    geo = GeocodingService.shared()
+    analytics_conf = config.get('analytics') or {}
+    analytics = RateAnalytics(analytics_conf.get('dir', 'data/analytics'))
+    pipeline = ShiftPipeline(history, geo, listing_memo=listing_memo, analytics=analytics,
+                             **(config.get('pipeline') or {}))
+
+    run_started = time.monotonic()
+    total = 0
+    try:
+        async with pipeline:
+            async for result in runner.run(jobs, pipeline):
+                total += len(result['shifts'])
+        print(f"All agencies finished in {time.monotonic() - run_started:.1f}s")
+    finally:
+        await browser_manager.close()
+        await geo.close()
+
+    # 5. Shifts were stored as they streamed in; flush what the store still buffers
+    print(f"Scrape Complete. Total shifts: {total}")
+    history.commit()
+    history.export()
+    listing_memo.save()
+
+    # Spatial index of the active shifts for radius queries (near.py), one row per real shift
+    with Metrics.shared().span("spatial_index") as span:
+        index = ShiftIndex.build(link_duplicates(history.active_shifts()))
+        index.save(storage_conf.get('index', 'data/shift_index.json'))
+        span.count("shifts", len(index))
+
+    # 6. Generate the map page and its hashed data shards (skipped when the data is unchanged)
+    map_conf = config.get('map') or {}
+    gen = MapGenerator(
+        output_file=map_conf.get('output', 'index.html'),
+        store=history,
+        data_dir=map_conf.get('data_dir'),
+        data_url=map_conf.get('data_url'),
+        precompress=map_conf.get('precompress', True),
+        dedupe=map_conf.get('dedupe', True)
+    )
     gen.generate()
 
+    # Day rate median / p90 / volume per region and agency per ISO week, updated from this run's delta
+    with Metrics.shared().span("analytics") as span:
+        span.count("groups", analytics.commit(history))
+        analytics.save()
+        heatmap = os.path.join(gen.data_dir, 'heatmap.json')
+        if not analytics.export_heatmap(heatmap, weeks=analytics_conf.get('heatmap_weeks', 4)):
+            span.status = "unchanged"
+    history.close()
+
+    # 7. Run report: per-stage timings, counts and peak RSS (data/run_report.json, data/metrics.prom)
+    Metrics.shared().write('data')
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Shifts near a postcode or town, from the spatial index the daily run saves.
+
+    python near.py SK17 --radius 25 --min-total 300 --from 2026-03-01 --to 2026-03-31
+    python near.py "Leeds" --radius 10 --sort total --limit 20
+"""
+import argparse
+import sys
+import time
+from core.geocoder import UKGeocoder
+from core.spatial import ShiftIndex
+
+KM_PER_MILE = 1.609344
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find stored shifts near a postcode or town")
+    parser.add_argument("place", help="postcode (full or outward, e.g. SK17) or town name")
+    parser.add_argument("--radius", type=float, default=25, help="search radius in miles (default 25)")
+    parser.add_argument("--km", action="store_true", help="radius and distances in kilometres")
+    parser.add_argument("--from", dest="date_from", help="earliest shift date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="latest shift date, YYYY-MM-DD")
+    parser.add_argument("--min-total", type=float, help="minimum total pay in pounds")
+    parser.add_argument("--sort", choices=["distance", "total"], default="distance")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--index", default="data/shift_index.json")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        index = ShiftIndex.load(args.index)
+    except (OSError, ValueError) as e:
+        print(f"Could not load the shift index: {e}")
+        return 1
+
+    unit, scale = ("km", 1.0) if args.km else ("mi", KM_PER_MILE)
+    geocoder = UKGeocoder()
+    started = time.perf_counter()
+    results = index.near(args.place, args.radius * scale, geocoder, date_from=args.date_from, date_to=args.date_to,
+                         min_total=args.min_total, sort=args.sort, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    geocoder.close()
+    if results is None:
+        print(f"Could not find {args.place!r}")
+        return 1
+
+    print(f"{len(results)} shifts within {args.radius:g} {unit} of {args.place} "
+          f"(index {index.digest}, {elapsed_ms:.1f} ms)")
+    for r in results:
+        print(f"{r['distance_km'] / scale:>6.1f} {unit}  {r['day'] or '?':<10}  {r['time'] or '':<15}  "
+              f"£{r['total'] or 0:>7.2f}  {', '.join(filter(None, r['agencies'])):<14}  {r['company'] or '':<22}  {r['location'] or ''}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
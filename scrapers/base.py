@@ -1,51 +1,694 @@
 import asyncio
+import contextlib
+import json
 import os
+import re
+import time
 from abc import ABC, abstractmethod
-from playwright.async_api import async_playwright
-from core.geocoder import UKGeocoder
+import aiohttp
+from bs4 import BeautifulSoup
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from core.browser import BrowserManager
+from core.http_client import HttpFetcher
+from core.metrics import Metrics
+from core.geoservice import GeocodingService
+from core.history import shift_fingerprint
+from core.listing import listing_fingerprint, row_hash
+from core.sessions import SessionStore
+from core.shift import ShiftParser, as_record
+
+def iter_records(payload, keys):
+    """
+    Walks a JSON payload and yields every dict that has at least one of `keys`.
+    API responses wrap their rows differently ({"data": [...]}, {"results": {...}}),
+    so we look everywhere rather than hard-coding the envelope.
+    """
+    if isinstance(payload, dict):
+        if any(k in payload for k in keys):
+            yield payload
+            return
+        for value in payload.values():
+            yield from iter_records(value, keys)
+    elif isinstance(payload, list):
+        for item in payload:
+            yield from iter_records(item, keys)
+
+def select_text(element, selector):
+    """
+    BeautifulSoup counterpart of the in-page `text(sel)` helpers: text of the
+    first match or None.
+    """
+    match = element.select_one(selector)
+    return match.get_text() if match is not None else None
+
+def parse_html(body):
+    return BeautifulSoup(body, 'lxml')
+
+# Assets that never affect the data we extract. Agencies can override either
+# list (or set enabled: false) under `block:` in agencies.yaml.
+DEFAULT_BLOCK_POLICY = {
+    "enabled": True,
+    "resource_types": ["image", "font", "media"],
+    "url_patterns": [
+        r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net",
+        r"hotjar\.com", r"facebook\.(net|com)/", r"clarity\.ms", r"intercom(cdn)?\.io",
+        r"tile\.openstreetmap\.org", r"maps\.(googleapis|gstatic)\.com"
+    ]
+}
+
+# Readiness wait budgets in ms; agencies override any of them under `waits:` in agencies.yaml
+DEFAULT_WAITS = {
+    "login": 20000,        # login form gone / dashboard reached
+    "login_form": 5000,    # login form or a logged-in marker shown after navigating
+    "rows": 15000,         # first listing row or an empty-state message
+    "stable_ms": 500,      # row count unchanged this long = listing finished rendering
+    "stable_timeout": 5000,
+    "empty_grace": 1000,   # rows still allowed to replace an early "no shifts" message
+    "api": 2000,           # captured API response; short, since the DOM fallback waits for rows anyway
+}
+
+# Re-evaluated by wait_for_function until the row count has not changed for `quiet` ms
+STABLE_SCRIPT = """
+([sel, quiet]) => {
+    const n = document.querySelectorAll(sel).length;
+    const now = performance.now();
+    const seen = window.__rowCounts || (window.__rowCounts = {});
+    if (!seen[sel] || seen[sel].n !== n) {
+        seen[sel] = {n, t: now};
+        return false;
+    }
+    return n > 0 && now - seen[sel].t >= quiet;
+}
+"""
+
+class ListingTimeout(Exception):
+    """
+    Neither listing rows nor an empty-state message appeared in time.
+    Unlike an empty listing this means the scrape is incomplete.
+    """
 
 class BaseScraper(ABC):
-    def __init__(self, secrets):
+    # Unit assumed for a listed rate that doesn't say "/hr" or "/day"
+    rate_unit = 'day'
+    # Agency site root; `base_url:` in agencies.yaml overrides it (the benchmark points it at a local server)
+    BASE_URL = ""
+
+    def __init__(self, secrets, browser_manager=None, session_store=None, config=None, geo_service=None,
+                 listing_memo=None):
         self.secrets = secrets
+        self.config = config or {}
+        self.base_url = (self.config.get('base_url') or self.BASE_URL).rstrip('/')
         self.shifts = []
-        # Initialize UK Postcode engine
-        self.geo = UKGeocoder()
+        # Set when the run did not complete (login/page errors); its listing is then partial
+        self.failed = False
+        # Shared Chromium for the run; if none is given the scraper owns its own
+        self.browser_manager = browser_manager
+        self._owns_browser = browser_manager is None
+        # Encrypted storage_state from previous runs, used to skip the login form
+        self.session_store = session_store or SessionStore()
+        self.session_restored = False
+        # JSON responses captured from the agency's own API (see api_patterns in agencies.yaml)
+        self.api_patterns = [re.compile(p) for p in self.config.get('api_patterns', [])]
+        self.api_payloads = []
+        self._api_event = asyncio.Event()
+        self._capture_tasks = set()
+        # Request blocking policy and what it let through / stopped
+        self.block_policy = {**DEFAULT_BLOCK_POLICY, **(self.config.get('block') or {})}
+        self._block_patterns = [re.compile(p) for p in self.block_policy['url_patterns']]
+        self.traffic = {
+            "allowed_requests": 0,
+            "allowed_bytes": 0,
+            "blocked_requests": 0,
+            "blocked_by_type": {}
+        }
+        self._traffic_tasks = set()
+        # Readiness waits: per-agency budgets, and what each wait actually took
+        self.wait_budgets = {**DEFAULT_WAITS, **(self.config.get('waits') or {})}
+        # Messages the agency's listing shows instead of rows (`empty_state:` in agencies.yaml).
+        # There is no default: a generic "no jobs" match would also hit banners elsewhere on
+        # the page and expire the agency's whole history.
+        self.empty_states = list(self.config.get('empty_state') or [])
+        self.waits = []
+        # Run-wide spans and counters (written to data/ at the end of the run)
+        self.metrics = Metrics.shared()
+        # UK Postcode engine, shared process-wide so the datasets load once
+        self.geo = geo_service or GeocodingService.shared()
+        # Dates, times and rates are parsed once, here, as each shift is scraped
+        self.parser = ShiftParser(self.agency_name, self.rate_unit)
+        # Set while stream() is consuming this scraper; add_shift hands each shift to it
+        self._outbox = None
+        # Listing as of the last complete run (core.listing.ListingMemo); `incremental: false` turns it off
+        self.listing_memo = listing_memo if self.config.get('incremental', True) else None
+        self.listing_fingerprint = None
+        # This run's listing rows (row hash -> shift id) and the stored shifts reused for unchanged rows
+        self.listing_rows = {}
+        self.reused = set()
+
+    @property
+    def agency_name(self):
+        return self.secrets.get('AGENCY_NAME') or self.__class__.__name__
+
+    def url(self, path):
+        """
+        Absolute URL for a site path ("/login"); absolute URLs pass through.
+        """
+        return path if path.startswith(('http://', 'https://')) else self.base_url + path
 
     async def init_browser(self):
-        self.playwright = await async_playwright().start()
-        # Launch browser with "Stealth" args to look like a real person
-        # We use a user data dir to potentially cache sessions if needed, but for now ephemeral is safer for clean tests
-        self.browser = await self.playwright.chromium.launch(headless=True)
-        
-        # Create a context with a realistic user agent and viewport
-        self.context = await self.browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={'width': 1920, 'height': 1080},
-            locale='en-GB',
-            timezone_id='Europe/London'
-        )
-        
-        # Hide the webdriver property to evade simple bot detection
-        await self.context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
+        if self._owns_browser:
+            self.browser_manager = BrowserManager()
+
+        # Each scraper gets an isolated context (realistic UA, viewport, stealth script)
+        options = {}
+        state = self.session_store.load(self.agency_name)
+        if state:
+            options['storage_state'] = state
+            self.session_restored = True
+            print(f"   Restored saved session for {self.agency_name}")
+
+        self.context = await self.browser_manager.new_context(self.agency_name, **options)
+        if self.block_policy.get('enabled'):
+            await self.context.route("**/*", self._route_request)
+            self.context.on("requestfinished", self._on_request_finished)
         self.page = await self.context.new_page()
 
+        # Listen before the first navigation so the login redirect's XHRs are seen too
+        if self.api_patterns:
+            self.page.on("response", self._on_response)
+
+    async def _route_request(self, route):
+        request = route.request
+        if request.resource_type in self.block_policy['resource_types'] or \
+                any(p.search(request.url) for p in self._block_patterns):
+            self.traffic['blocked_requests'] += 1
+            by_type = self.traffic['blocked_by_type']
+            by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            await route.abort()
+        else:
+            self.traffic['allowed_requests'] += 1
+            await route.continue_()
+
+    def _on_request_finished(self, request):
+        task = asyncio.ensure_future(self._count_bytes(request))
+        self._traffic_tasks.add(task)
+        task.add_done_callback(self._traffic_tasks.discard)
+
+    async def _count_bytes(self, request):
+        try:
+            sizes = await request.sizes()
+            self.traffic['allowed_bytes'] += sizes['responseBodySize'] + sizes['responseHeadersSize']
+        except Exception:
+            # Context closed before the sizes came back
+            pass
+
+    def print_traffic(self):
+        t = self.traffic
+        if not (t['allowed_requests'] or t['blocked_requests']):
+            return
+        self.metrics.count("requests", t['allowed_requests'], agency=self.agency_name, outcome="allowed")
+        self.metrics.count("response_bytes", t['allowed_bytes'], agency=self.agency_name)
+        for resource_type, n in t['blocked_by_type'].items():
+            self.metrics.count("requests", n, agency=self.agency_name, outcome="blocked", type=resource_type)
+        blocked = ", ".join(f"{k}: {v}" for k, v in sorted(t['blocked_by_type'].items()))
+        # Blocked requests are never downloaded, so only their count is known
+        print(f"   Traffic for {self.agency_name}: allowed {t['allowed_requests']} requests "
+              f"({t['allowed_bytes'] / 1024:.0f} KB), blocked {t['blocked_requests']} ({blocked or 'none'})")
+
+    # --- Readiness waits ---
+
+    def _record_wait(self, name, started, outcome):
+        seconds = time.monotonic() - started
+        self.waits.append({"name": name, "seconds": round(seconds, 3), "outcome": outcome})
+        self.metrics.observe("wait", seconds, status=outcome, agency=self.agency_name, wait=name)
+
+    async def goto(self, url, page=None):
+        """
+        page.goto with a navigation span.
+        """
+        with self.metrics.span("navigate", agency=self.agency_name):
+            return await (page or self.page).goto(url)
+
+    @contextlib.asynccontextmanager
+    async def timed_wait(self, name):
+        """
+        Records how long the wrapped wait took and whether it timed out:
+
+            async with self.timed_wait("login"):
+                await self.page.wait_for_url("**/dashboard**", timeout=self.wait_budgets['login'])
+        """
+        started = time.monotonic()
+        try:
+            yield
+        except (PlaywrightTimeoutError, asyncio.TimeoutError):
+            self._record_wait(name, started, "timeout")
+            raise
+        self._record_wait(name, started, "ok")
+
+    async def login_required(self, form_selector, logged_in):
+        """
+        Races the login form against markers only a logged-in page shows
+        (`logged_in`: selectors), so a restored session costs no fixed wait.
+        Returns True when the form is what appeared.
+        """
+        form = self.page.locator(form_selector)
+        marker = form
+        for selector in logged_in:
+            marker = marker.or_(self.page.locator(selector))
+        try:
+            async with self.timed_wait("login_form"):
+                await marker.first.wait_for(timeout=self.wait_budgets['login_form'])
+        except PlaywrightTimeoutError:
+            # Neither showed up in time; go by whether the form is there now
+            return await form.is_visible()
+        return await form.first.is_visible()
+
+    async def wait_for_login(self, form_selector):
+        """
+        Waits for the login form to go away after submitting it, instead of
+        waiting for network idle (SPAs that poll never go idle).
+        """
+        async with self.timed_wait("login"):
+            await self.page.wait_for_selector(form_selector, state="hidden", timeout=self.wait_budgets['login'])
+
+    async def wait_for_rows(self, selector, page=None):
+        """
+        Waits for the first listing row or an empty-state message, whichever
+        shows first. Returns True when there are rows, False for a listing
+        that is genuinely empty; raises ListingTimeout when neither appears.
+        """
+        page = page or self.page
+        rows = ready = page.locator(selector)
+        for message in self.empty_states:
+            ready = ready.or_(page.locator(message))
+
+        started = time.monotonic()
+        try:
+            await ready.first.wait_for(timeout=self.wait_budgets['rows'])
+        except PlaywrightTimeoutError:
+            self._record_wait("rows", started, "timeout")
+            raise ListingTimeout(f"no rows ({selector}) or empty-state message after {self.wait_budgets['rows']} ms")
+
+        if not await rows.count():
+            # Some listings flash "no results" while their data is still loading
+            try:
+                await rows.first.wait_for(timeout=self.wait_budgets['empty_grace'])
+            except PlaywrightTimeoutError:
+                self._record_wait("rows", started, "empty")
+                return False
+
+        self._record_wait("rows", started, "ok")
+        return True
+
+    async def wait_for_stable(self, selector, page=None):
+        """
+        Waits until the number of rows has stopped changing for `stable_ms`,
+        i.e. the listing has finished rendering. Never fails the scrape: after
+        `stable_timeout` whatever is there is read.
+        """
+        started = time.monotonic()
+        try:
+            await (page or self.page).wait_for_function(
+                STABLE_SCRIPT, arg=[selector, self.wait_budgets['stable_ms']],
+                polling=100, timeout=self.wait_budgets['stable_timeout']
+            )
+            self._record_wait("stable", started, "ok")
+        except PlaywrightTimeoutError:
+            self._record_wait("stable", started, "timeout")
+
+    def print_waits(self):
+        if not self.waits:
+            return
+        summary = ", ".join(
+            f"{w['name']} {w['seconds']:.2f}s" + ("" if w['outcome'] == "ok" else f" ({w['outcome']})")
+            for w in self.waits
+        )
+        print(f"   Waits for {self.agency_name}: {summary}")
+
+    def _on_response(self, response):
+        if any(p.search(response.url) for p in self.api_patterns):
+            task = asyncio.ensure_future(self._capture_response(response))
+            self._capture_tasks.add(task)
+            task.add_done_callback(self._capture_tasks.discard)
+
+    async def _capture_response(self, response):
+        try:
+            if 'json' not in (response.headers.get('content-type') or ''):
+                return
+            payload = await response.json()
+        except Exception:
+            # Body already gone (navigation) or not valid JSON
+            return
+        self.api_payloads.append({"url": response.url, "data": payload})
+        self._api_event.set()
+
+    async def wait_for_api_data(self, timeout=None):
+        """
+        Waits until at least one matching JSON response has been captured
+        (or the timeout passes) and returns all payloads seen so far.
+        """
+        if not self.api_patterns:
+            return []
+        if timeout is None:
+            timeout = self.wait_budgets['api'] / 1000
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._api_event.wait(), timeout=timeout)
+            self._record_wait("api", started, "ok")
+        except asyncio.TimeoutError:
+            self._record_wait("api", started, "timeout")
+        # Let responses that are still being read finish
+        if self._capture_tasks:
+            await asyncio.gather(*list(self._capture_tasks), return_exceptions=True)
+        return self.api_payloads
+
+    def api_records(self, keys):
+        """
+        All rows across the captured payloads that look like shift records.
+        """
+        records = []
+        seen = set()
+        for captured in self.api_payloads:
+            for record in iter_records(captured["data"], keys):
+                # SPAs often re-poll the same list; keep each row once
+                fingerprint = json.dumps(record, sort_keys=True, default=str)
+                if fingerprint not in seen:
+                    seen.add(fingerprint)
+                    records.append(record)
+        return records
+
+    async def save_session(self):
+        """
+        Stores the logged-in context state so the next run can skip the login form.
+        """
+        if self.session_store.enabled:
+            self.session_store.save(self.agency_name, await self.context.storage_state())
+
+    def session_expired(self):
+        """
+        Called when a login form is shown despite a restored session.
+        """
+        if self.session_restored:
+            print(f"   Saved session for {self.agency_name} has expired, logging in again")
+            self.session_store.discard(self.agency_name)
+            self.session_restored = False
+
+    async def extract_all(self, selector, script, page=None):
+        """
+        Runs `script` once over every element matching `selector` and returns
+        the JSON-serialisable result. One browser round trip for the whole
+        listing instead of several per card.
+        """
+        started = time.monotonic()
+        with self.metrics.span("extract", agency=self.agency_name) as span:
+            rows = await (page or self.page).locator(selector).evaluate_all(script)
+            span.count("rows", len(rows))
+        print(f"   Extracted {len(rows)} rows in {time.monotonic() - started:.3f}s")
+        return rows
+
+    @property
+    def pagination(self):
+        """
+        `pagination:` settings from agencies.yaml:
+          mode: url      url_template with {page}, start, max_pages, tabs (pages open at once)
+          mode: scroll   max_scrolls, scroll_wait (ms), load_more (button selector, optional)
+        """
+        return self.config.get('pagination') or {}
+
+    async def load_listing(self, url, selector, script):
+        """
+        Opens the listing and returns every row across its pages. With
+        `mode: url` the remaining pages are loaded `tabs` at a time in extra
+        tabs of this (logged-in) context; with `mode: scroll` the page is
+        scrolled until no more rows appear. An empty listing returns []
+        straight away; ListingTimeout is raised if the first page shows
+        neither rows nor an empty-state message.
+        """
+        conf = self.pagination
+        mode = conf.get('mode')
+        start = conf.get('start', 1)
+        if mode == 'url':
+            url = self.url(conf['url_template'].format(page=start))
+
+        await self.goto(url)
+        if not await self.wait_for_rows(selector):
+            print("   Listing is empty")
+            return []
+        await self.wait_for_stable(selector)
+        if mode == 'scroll':
+            await self.scroll_listing(selector)
+        rows = await self.extract_all(selector, script)
+
+        if mode == 'url' and rows:
+            rows.extend(await self._load_pages(conf, start + 1, selector, script, rows[0]))
+        return rows
+
+    async def _load_pages(self, conf, first, selector, script, first_row):
+        tabs = max(1, int(conf.get('tabs', 3)))
+        last = conf.get('start', 1) + conf.get('max_pages', 20) - 1
+        started = time.monotonic()
+        # Some listings repeat their last page for any page number past the end
+        seen = {json.dumps(first_row, sort_keys=True)}
+        rows, loaded, page_no = [], 1, first
+
+        while page_no <= last:
+            batch = range(page_no, min(page_no + tabs, last + 1))
+            results = await asyncio.gather(*(
+                self._load_tab(self.url(conf['url_template'].format(page=n)), selector, script) for n in batch
+            ))
+            timed_out = False
+            for n, page_rows in zip(batch, results):
+                if page_rows is None:
+                    # Not the end of the listing, just a page that never showed: the run is partial
+                    print(f"   Listing page {n} showed neither rows nor an empty-state message")
+                    self.failed = True
+                    timed_out = True
+                    continue
+                if not page_rows or json.dumps(page_rows[0], sort_keys=True) in seen:
+                    print(f"   Loaded {loaded} listing pages in {time.monotonic() - started:.1f}s")
+                    return rows
+                seen.add(json.dumps(page_rows[0], sort_keys=True))
+                rows.extend(page_rows)
+                loaded += 1
+            if timed_out:
+                print(f"   Loaded {loaded} listing pages (incomplete) in {time.monotonic() - started:.1f}s")
+                return rows
+            page_no += len(batch)
+
+        print(f"   Loaded {loaded} listing pages (max_pages reached) in {time.monotonic() - started:.1f}s")
+        return rows
+
+    async def _load_tab(self, url, selector, script):
+        """
+        Rows of one listing page: [] past the last page (an empty-state
+        message), None when the page showed neither rows nor a message.
+        """
+        tab = await self.context.new_page()
+        try:
+            await self.goto(url, page=tab)
+            try:
+                if not await self.wait_for_rows(selector, page=tab):
+                    return []  # Past the last page
+            except ListingTimeout:
+                return None
+            await self.wait_for_stable(selector, page=tab)
+            return await self.extract_all(selector, script, page=tab)
+        finally:
+            await tab.close()
+
+    async def scroll_listing(self, selector):
+        """
+        Infinite scroll / "load more": keeps scrolling the last row into
+        view (or clicking `load_more`) until the row count stops growing.
+        Returns the final row count.
+        """
+        conf = self.pagination
+        load_more = conf.get('load_more')
+        rows = self.page.locator(selector)
+        count = await rows.count()
+        if not count:
+            return 0
+
+        for _ in range(conf.get('max_scrolls', 30)):
+            if load_more:
+                button = self.page.locator(load_more).first
+                if not await button.is_visible():
+                    break
+                await button.click()
+            else:
+                await rows.last.scroll_into_view_if_needed()
+                await self.page.mouse.wheel(0, 5000)
+            try:
+                await self.page.wait_for_function(
+                    "([sel, n]) => document.querySelectorAll(sel).length > n",
+                    arg=[selector, count], timeout=conf.get('scroll_wait', 3000)
+                )
+            except PlaywrightTimeoutError:
+                break
+            count = await rows.count()
+
+        print(f"   Scrolled listing to {count} rows")
+        return count
+
+    @property
+    def fast_path(self):
+        conf = self.config.get('http_fast_path') or {}
+        return conf if conf.get('enabled') else None
+
+    def parse_listing(self, body, is_json):
+        """
+        Turns one HTTP listing response into rows shaped like the DOM
+        extraction output. Scrapers that support the fast path override this.
+        """
+        return []
+
+    async def fetch_listing_http(self):
+        """
+        Browser-free listing: exports the logged-in cookies and fetches the
+        configured listing URLs over pooled HTTP. On success this agency's
+        browser context is closed straight away.
+        Returns the rows, or None to fall back to the browser path.
+        """
+        conf = self.fast_path
+        if not conf:
+            return None
+
+        cookies = await self.context.cookies()
+        rows = []
+        with self.metrics.span("http_listing", agency=self.agency_name) as span:
+            try:
+                async with HttpFetcher(cookies, concurrency=conf.get('concurrency', 4)) as fetcher:
+                    for url in conf.get('listing_urls', []):
+                        rows.extend(await fetcher.fetch_pages(self.url(url), self.parse_listing, max_pages=conf.get('max_pages', 20)))
+                    span.count("requests", fetcher.requests)
+                    span.count("bytes", fetcher.bytes)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                span.status = "error"
+                print(f"   HTTP fast path failed ({e}), using the browser instead")
+                return None
+            span.count("rows", len(rows))
+
+        if not rows:
+            print("   HTTP fast path returned no rows, using the browser instead")
+            return None
+
+        await self.close_context()
+        return rows
+
+    def filter_listing(self, rows):
+        """
+        Returns the listing rows that need processing: those not seen, byte
+        for byte, in the last complete run. Rows that were seen already map
+        to a stored shift, which is kept (and its last_seen bumped) without
+        parsing, geocoding or writing it again. Without a memo every row is
+        returned.
+        """
+        hashes = [row_hash(row) for row in rows]
+        self.listing_fingerprint = listing_fingerprint(hashes)
+        if self.listing_memo is None:
+            return rows
+
+        known = self.listing_memo.rows(self.agency_name)
+        if self.listing_memo.fingerprint(self.agency_name) == self.listing_fingerprint:
+            print(f"   Listing unchanged since the last run ({len(rows)} rows)")
+
+        fresh = []
+        for h, row in zip(hashes, rows):
+            shift_id = known.get(h)
+            if shift_id is None:
+                fresh.append(row)
+            else:
+                self.listing_rows[h] = shift_id
+                self.reused.add(shift_id)
+        self.metrics.count("listing_rows_reused", len(rows) - len(fresh), agency=self.agency_name)
+        print(f"   {len(rows) - len(fresh)} rows unchanged, {len(fresh)} new or changed")
+        return fresh
+
+    async def add_shift(self, raw, row=None):
+        """
+        Parses a scraped row (listed text for date/time/rate/total) into a
+        Shift and records it. When the scraper is being streamed the shift is
+        handed downstream straight away; a full queue makes the scrape wait.
+        `row` is the raw listing row it came from, remembered for the next run.
+        """
+        shift = self.parser.build(raw)
+        self.shifts.append(shift)
+        if row is not None:
+            self.listing_rows[row_hash(row)] = shift_fingerprint(as_record(shift))
+        if self._outbox is not None:
+            await self._outbox.put(shift)
+        return shift
+
+    async def stream(self, queue_size=100):
+        """
+        Runs the scraper and yields each Shift as soon as it is extracted,
+        rather than the whole list once the browser has closed. Errors from
+        run() are raised after the shifts collected before them.
+        """
+        self._outbox = asyncio.Queue(maxsize=queue_size)
+        done = object()
+
+        async def produce():
+            try:
+                await self.run()
+            finally:
+                # When cancelled nobody is reading any more, and the queue may be full
+                if not asyncio.current_task().cancelling():
+                    await self._outbox.put(done)
+
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                shift = await self._outbox.get()
+                if shift is done:
+                    break
+                yield shift
+            await task
+        finally:
+            if not task.done():
+                # Consumer gave up (timeout / cancellation): stop the scrape and let it close its browser
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            self._outbox = None
+
     async def get_lat_lon(self, location_str):
         """
-        Geocodes a location string using the core geocoder.
+        Geocodes a location string using the shared geocoding service.
+        Never blocks the event loop.
+        """
+        return await self.geo.get_lat_lon(location_str)
+
+    async def close_context(self):
+        if getattr(self, 'context', None) is not None:
+            if self._traffic_tasks:
+                await asyncio.gather(*list(self._traffic_tasks), return_exceptions=True)
+            await self.context.close()
+            self.context = None
+            self.print_traffic()
+            self.print_waits()
+
+    async def error_screenshot(self, path):
+        """
+        Screenshot of the page for a failed run. Skipped once the context is
+        closed (e.g. after the HTTP fast path), and never raises: it must not
+        hide the error being reported.
         """
-        return self.geo.get_lat_lon(location_str)
+        page = getattr(self, 'page', None)
+        if getattr(self, 'context', None) is None or page is None or page.is_closed():
+            return
+        try:
+            await page.screenshot(path=path)
+        except Exception as e:
+            print(f"   Could not save {path}: {e}")
 
     async def close(self):
-        if hasattr(self, 'browser'):
-            await self.browser.close()
-        if hasattr(self, 'playwright'):
-            await self.playwright.stop()
+        await self.close_context()
+        if self._owns_browser and self.browser_manager is not None:
+            await self.browser_manager.close()
 
     @abstractmethod
     async def run(self):
         """
         Main execution method for the scraper.
-        Must return a list of shift dictionaries.
+        Must return the list of Shift records (see add_shift).
         """
         pass
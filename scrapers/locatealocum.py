@@ -1,22 +1,67 @@
-import asyncio
-from .base import BaseScraper
+from core.parsing import job_id_from_link
+from .base import BaseScraper, parse_html, select_text
+
+# Runs in the browser over every .jobCardLink anchor and returns plain JSON
+CARD_SCRIPT = """
+cards => cards.map(card => {
+    const text = sel => {
+        const el = card.querySelector(sel);
+        return el ? el.textContent : null;
+    };
+    const img = card.querySelector('img');
+    return {
+        date: text('.cardDate'),
+        time: text('.cardTime'),
+        rate: text('.cardRateHr'),
+        total: text('.cardRateTotal'),
+        location: text('.cardLocation'),
+        img_alt: img ? img.getAttribute('alt') : null,
+        href: card.getAttribute('href')
+    };
+})
+"""
+
+def _or_default(value, default):
+    return default if value is None else value
 
 class LocateALocumScraper(BaseScraper):
+    BASE_URL = "https://locatealocum.com"
+    # Cards list an hourly rate (.cardRateHr) next to the shift total
+    rate_unit = 'hour'
+
+    def parse_listing(self, body, is_json):
+        # Same fields as CARD_SCRIPT, read from server-rendered HTML
+        rows = []
+        for card in parse_html(body).select(".jobCardLink"):
+            img = card.select_one("img")
+            rows.append({
+                "date": select_text(card, ".cardDate"),
+                "time": select_text(card, ".cardTime"),
+                "rate": select_text(card, ".cardRateHr"),
+                "total": select_text(card, ".cardRateTotal"),
+                "location": select_text(card, ".cardLocation"),
+                "img_alt": img.get("alt") if img is not None else None,
+                "href": card.get("href")
+            })
+        return rows
+
     async def run(self):
         print("Starting LocateALocum...")
         await self.init_browser()
         
         try:
             # 1. Login
-            await self.page.goto("https://locatealocum.com/login")
+            await self.goto(self.url("/login"))
             
             # Check if login is needed by looking for the email input field
             if await self.page.is_visible("input[name='email']"):
+                 self.session_expired()
                  user = self.secrets.get('LOCATE_USER') or ''
                  password = self.secrets.get('LOCATE_PASS') or ''
                  
                  if not user or not password:
                      print("   Warning: LOCATE_USER or LOCATE_PASS not set. Skipping.")
+                     self.failed = True
                      return []
                  
                  await self.page.fill("input[name='email']", user)
@@ -24,68 +69,48 @@ class LocateALocumScraper(BaseScraper):
                  await self.page.click("button[type='submit']")
                  
                  # Wait for dashboard
-                 await self.page.wait_for_url("**/dashboard**", timeout=20000)
+                 async with self.timed_wait("login"):
+                     await self.page.wait_for_url("**/dashboard**", timeout=self.wait_budgets['login'])
+                 await self.save_session()
             
             print("Login Successful")
 
-            # 2. Go to Search Page (Auto-filter for Locum Optom)
-            # Adjust URL parameters as needed for default filters
-            search_url = "https://locatealocum.com/jobs/search?jobType=1008&sort=startTime%2Casc"
-            await self.page.goto(search_url)
-            
-            # Wait for cards to load
-            await self.page.wait_for_selector(".jobCardLink", timeout=15000)
-            # Give a little extra time for dynamic content to settle
-            await asyncio.sleep(2)
+            # 2. Fetch the listing over plain HTTP if the fast path is enabled
+            cards = await self.fetch_listing_http()
+
+            if cards is None:
+                # Go to Search Page (Auto-filter for Locum Optom)
+                # Adjust URL parameters as needed for default filters
+                search_url = self.url("/jobs/search?jobType=1008&sort=startTime%2Casc")
 
-            # 3. Extract Cards using the correct selectors
-            cards = await self.page.locator(".jobCardLink").all()
+                # 3. Extract all cards, one browser round trip per page;
+                #    further pages load in parallel tabs (pagination in agencies.yaml)
+                cards = await self.load_listing(search_url, ".jobCardLink", CARD_SCRIPT)
             
             print(f"   Found {len(cards)} potential shifts")
 
-            for card in cards:
+            # Cards unchanged since the last complete run are already stored
+            for card in self.filter_listing(cards):
                 try:
-                    # -- Extract Data using correct CSS classes --
-                    
-                    # Date: .cardDate element
-                    date_el = card.locator(".cardDate")
-                    date_text = await date_el.text_content() if await date_el.count() > 0 else "Unknown"
-
-                    # Time: .cardTime element
-                    time_el = card.locator(".cardTime")
-                    time_text = await time_el.text_content() if await time_el.count() > 0 else "Unknown"
-
-                    # Rate: .cardRateHr (hourly rate)
-                    rate_el = card.locator(".cardRateHr")
-                    rate_text = await rate_el.text_content() if await rate_el.count() > 0 else "N/A"
-
-                    # Total: .cardRateTotal
-                    total_el = card.locator(".cardRateTotal")
-                    total_text = await total_el.text_content() if await total_el.count() > 0 else "0"
-                    
-                    # Location: .cardLocation (may contain icon, just get text)
-                    location_el = card.locator(".cardLocation")
-                    location_text = await location_el.text_content() if await location_el.count() > 0 else "Unknown"
+                    # Missing elements come back as null
+                    date_text = _or_default(card.get('date'), "Unknown")
+                    time_text = _or_default(card.get('time'), "Unknown")
+                    rate_text = _or_default(card.get('rate'), "N/A")
+                    total_text = _or_default(card.get('total'), "0")
                     # Clean up location (remove icon text artifacts)
-                    location_text = location_text.strip()
-                    
+                    location_text = _or_default(card.get('location'), "Unknown").strip()
+
                     # Company: Not visible in public cards, try to get from img if present
-                    img = card.locator("img")
-                    if await img.count() > 0:
-                        img_alt = await img.first.get_attribute("alt")
-                        company = img_alt.replace(" Logo", "") if img_alt else "Unknown Agency"
-                    else:
-                        company = "Unknown Agency"
+                    img_alt = card.get('img_alt')
+                    company = img_alt.replace(" Logo", "") if img_alt else "Unknown Agency"
 
                     # Link: Get href from the card itself (it's an anchor)
-                    link = await card.get_attribute("href")
-                    full_link = f"https://locatealocum.com{link}" if link and link.startswith("/") else link or ""
-
-                    # -- Geocode --
-                    lat, lon = await self.get_lat_lon(location_text)
+                    link = card.get('href')
+                    full_link = f"{self.base_url}{link}" if link and link.startswith("/") else link or ""
 
                     shift = {
                         "agency": "LocateALocum",
+                        "shift_id": job_id_from_link(full_link),
                         "company": company,
                         "location": location_text,
                         "postcode": "", # LocateALocum often doesn't show postcode on card
@@ -93,11 +118,11 @@ class LocateALocumScraper(BaseScraper):
                         "time": time_text.strip() if time_text else "",
                         "rate": rate_text.strip() if rate_text else "",
                         "total": total_text.replace("Total:", "").replace("£", "").strip() if total_text else "0",
-                        "lat": lat,
-                        "lon": lon,
+                        "lat": None, # Filled in by the geocoding stage
+                        "lon": None,
                         "link": full_link
                     }
-                    self.shifts.append(shift)
+                    await self.add_shift(shift, row=card)
                     print(f"   + Scraped: {company} in {location_text}")
 
                 except Exception as e:
@@ -106,8 +131,9 @@ class LocateALocumScraper(BaseScraper):
                     continue
 
         except Exception as e:
+            self.failed = True
             print(f"LocateALocum Error: {e}")
-            await self.page.screenshot(path="error_locatealocum.png")
+            await self.error_screenshot("error_locatealocum.png")
         
         finally:
             await self.close()
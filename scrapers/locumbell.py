@@ -1,8 +1,18 @@
 import json
-import asyncio
-from .base import BaseScraper
+from .base import BaseScraper, iter_records, parse_html
+
+# Keys that identify a Locumbell shift row (same shape as the data-row-data attribute)
+ROW_KEYS = ('branch_name', 'Shift Dates')
+
+# Only shown once logged in: the shifts tab link, shift rows, or a log out control
+LOGGED_IN = ("a[href*='Available']", ".practice-icon", "text=/log ?out|sign ?out/i")
 
 class LocumbellScraper(BaseScraper):
+    def parse_listing(self, body, is_json):
+        if is_json:
+            return list(iter_records(json.loads(body), ROW_KEYS))
+        return [icon.get("data-row-data") for icon in parse_html(body).select(".practice-icon[data-row-data]")]
+
     async def run(self):
         agency_name = self.secrets.get('AGENCY_NAME', 'Locumbell')
         print(f"Starting {agency_name}...")
@@ -12,23 +22,20 @@ class LocumbellScraper(BaseScraper):
         try:
             # 1. Login
             login_url = self.secrets.get('LOGIN_URL') 
-            await self.page.goto(login_url)
+            await self.goto(login_url)
             
-            # Helper to check if we are on login page
-            # Locumbell (SPA) uses #username / #password
-            try:
-                await self.page.wait_for_selector("#username", timeout=5000)
-                is_login_page = True
-            except:
-                is_login_page = False
-
-            if is_login_page:
+            # Login form (Locumbell SPA: #username / #password) or a logged-in page, whichever shows
+            # first; `logged_in:` in agencies.yaml overrides the markers
+            logged_in = self.config.get('logged_in') or LOGGED_IN
+            if await self.login_required("#username", logged_in):
+                self.session_expired()
                 # Use generic keys if agency specific ones aren't provided
                 user = self.secrets.get('LOCUMB_USER') or ''
                 password = self.secrets.get('LOCUMB_PASS') or ''
                 
                 if not user or not password:
                     print(f"   Warning: LOCUMB_USER or LOCUMB_PASS not set. Skipping {agency_name}.")
+                    self.failed = True
                     return []
                 
                 await self.page.fill("#username", user)
@@ -37,54 +44,63 @@ class LocumbellScraper(BaseScraper):
                 await self.page.click("button:has-text('Log in')")
                 print("   Logging in...")
                 
-                # Wait for the #Available Shifts hash or the table to appear
-                # The URL usually changes to .../index.html#Available%20Shifts
-                # We wait for network idle to ensure redirection is complete
-                await self.page.wait_for_load_state('networkidle')
-                await asyncio.sleep(2) # Safety buffer
+                # The URL usually changes to .../index.html#Available%20Shifts;
+                # the form disappearing is the signal (the SPA polls, so it never goes network idle)
+                await self.wait_for_login("#username")
+                await self.save_session()
 
             print("Login Successful / Dashboard Loaded")
 
-            # 2. Ensure we are on the Available Shifts tab
-            # Sometimes it lands on Home. Force the hash if needed.
-            current_url = self.page.url
-            if "Available%20Shifts" not in current_url:
-                target_url = f"{current_url.split('#')[0]}#Available%20Shifts"
-                await self.page.goto(target_url)
-                await asyncio.sleep(2)
+            # 2. Fetch the rows over plain HTTP if the fast path is enabled
+            rows = await self.fetch_listing_http() or []
+
+            if not rows:
+                # Otherwise use the browser: ensure we are on the Available Shifts tab
+                # Sometimes it lands on Home. Force the hash if needed.
+                current_url = self.page.url
+                if "Available%20Shifts" not in current_url:
+                    target_url = f"{current_url.split('#')[0]}#Available%20Shifts"
+                    # Readiness is handled below by waiting for the API data or the table
+                    await self.goto(target_url)
             
-            # 3. Wait for the data table
-            try:
-                # We wait for the specific icon that holds the data
-                await self.page.wait_for_selector(".practice-icon", timeout=15000)
-            except:
-                print("   No shifts found (timeout waiting for table).")
-                return []
-
-            # 4. Extract Data from the 'data-row-data' attribute
-            icons = await self.page.locator(".practice-icon").all()
-            print(f"   Found {len(icons)} potential shifts")
-
-            for icon in icons:
+                # 3. Prefer the rows the SPA already fetched as JSON from its API
+                if self.api_patterns:
+                    await self.wait_for_api_data()
+                    rows = self.api_records(ROW_KEYS)
+                    if rows:
+                        print(f"   Found {len(rows)} shifts in captured API data")
+
+                if not rows:
+                    # Fallback: wait for the icon that holds the data, or an empty-table message
+                    # (neither in time raises ListingTimeout and marks the run failed)
+                    if not await self.wait_for_rows(".practice-icon"):
+                        print("   No shifts listed.")
+                        return []
+                    await self.wait_for_stable(".practice-icon")
+
+                    # 4. Extract Data from the 'data-row-data' attribute (all icons in one call)
+                    rows = await self.extract_all(".practice-icon", "icons => icons.map(i => i.getAttribute('data-row-data'))")
+                    print(f"   Found {len(rows)} potential shifts")
+
+            # Rows unchanged since the last complete run are already stored
+            for row in self.filter_listing(rows):
                 try:
-                    # Get the raw JSON string from the attribute
-                    raw_data = await icon.get_attribute("data-row-data")
-                    
-                    if not raw_data:
+                    if not row:
                         continue
-                        
-                    data = json.loads(raw_data)
+
+                    # API rows are already dicts, DOM rows are the raw attribute JSON
+                    data = json.loads(row) if isinstance(row, str) else row
 
                     # --- MAPPING DATA ---
                     postcode = data.get('postcode')
                     city = data.get('city', '')
                     location_name = f"{city}, {postcode}" if postcode else city
-                    
-                    # Geocode using our offline tool (prefer postcode)
-                    lat, lon = await self.get_lat_lon(postcode if postcode else city)
+
+                    shift_id = data.get('id') or data.get('shift_id')
 
                     shift = {
                         "agency": agency_name,
+                        "shift_id": str(shift_id) if shift_id is not None else "",
                         "company": data.get('branch_name', 'Unknown'),
                         "location": location_name,
                         "postcode": postcode,
@@ -92,20 +108,21 @@ class LocumbellScraper(BaseScraper):
                         "time": f"{data.get('start_time')} - {data.get('end_time')}",
                         "rate": f"£{data.get('Rate', 0)}/day",
                         "total": str(data.get('Rate', 0)),
-                        "lat": lat,
-                        "lon": lon,
+                        "lat": None, # Filled in by the geocoding stage
+                        "lon": None,
                         "link": login_url # Direct linking is hard in SPAs
                     }
                     
-                    self.shifts.append(shift)
+                    await self.add_shift(shift, row=row)
                     print(f"   + {shift['date']}: {shift['company']} (£{shift['total']})")
 
                 except Exception as e:
                     print(f"   X Error parsing row: {e}")
 
         except Exception as e:
+            self.failed = True
             print(f"Error: {e}")
-            await self.page.screenshot(path=f"error_{agency_name}.png")
+            await self.error_screenshot(f"error_{agency_name}.png")
         
         finally:
             await self.close()
@@ -1,88 +1,193 @@
 import asyncio
-from .base import BaseScraper
+import json
+from .base import BaseScraper, ListingTimeout, iter_records, parse_html, select_text
+
+# Pulls every job card in one evaluate call; innerText matches what inner_text() returned
+CARD_SCRIPT = """
+cards => cards.map(card => {
+    const text = sel => {
+        const el = card.querySelector(sel);
+        return el ? el.innerText : null;
+    };
+    const cities = card.querySelectorAll('.address-area h2');
+    return {
+        date: text('.locum-date'),
+        time: text('.locum-time'),
+        rate: text('.locum-price'),
+        city: cities.length ? cities[cities.length - 1].innerText : null
+    };
+})
+"""
+
+# Candidate field names for a job object in the search API response.
+# The first non-empty one wins.
+API_FIELDS = {
+    "id": ("id", "job_id", "jobId", "_id"),
+    "date": ("date", "job_date", "jobDate", "start_date", "startDate"),
+    "start": ("start_time", "startTime"),
+    "end": ("end_time", "endTime"),
+    "rate": ("rate", "price", "day_rate", "dayRate"),
+    "city": ("city", "town"),
+    "postcode": ("postcode", "post_code", "postCode"),
+}
+
+def _pick(record, field):
+    for name in API_FIELDS[field]:
+        value = record.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+def _card_from_api(record):
+    """
+    Maps an API job object onto the same shape CARD_SCRIPT returns,
+    or None if it doesn't look like a job.
+    """
+    date, rate, city = _pick(record, "date"), _pick(record, "rate"), _pick(record, "city")
+    if date is None or rate is None or city is None:
+        return None
+
+    start, end = _pick(record, "start"), _pick(record, "end")
+    job_id = _pick(record, "id")
+    return {
+        "id": str(job_id) if job_id is not None else "",
+        "date": str(date),
+        "time": f"{start} - {end}" if start and end else "",
+        "rate": f"£{rate}/day",
+        "city": str(city),
+        "postcode": _pick(record, "postcode") or ""
+    }
 
 class LocumotiveScraper(BaseScraper):
+    BASE_URL = "https://locumotive.co.uk"
+
+    def parse_listing(self, body, is_json):
+        if is_json:
+            return [c for c in map(_card_from_api, iter_records(json.loads(body), API_FIELDS['date'])) if c]
+
+        rows = []
+        for card in parse_html(body).select("div[class*='job_']"):
+            cities = card.select(".address-area h2")
+            rows.append({
+                "date": select_text(card, ".locum-date"),
+                "time": select_text(card, ".locum-time"),
+                "rate": select_text(card, ".locum-price"),
+                "city": cities[-1].get_text() if cities else None
+            })
+        return rows
+
     async def run(self):
         print("Starting Locumotive...")
         await self.init_browser()
         
         try:
             # 1. Login
-            await self.page.goto("https://locumotive.co.uk/login")
+            await self.goto(self.url("/login"))
             
             # Check if login required
             if await self.page.is_visible("input[formcontrolname='email']"):
+                self.session_expired()
                 user = self.secrets.get('LOCUMOTIVE_USER') or ''
                 password = self.secrets.get('LOCUMOTIVE_PASS') or ''
                 
                 if not user or not password:
                     print("   Warning: LOCUMOTIVE_USER or LOCUMOTIVE_PASS not set. Skipping.")
+                    self.failed = True
                     return []
                 
                 await self.page.fill("input[formcontrolname='email']", user)
                 await self.page.fill("input[formcontrolname='password']", password)
                 await self.page.click("button[type='submit']")
-                await self.page.wait_for_url("**/dashboard**", timeout=20000)
+                async with self.timed_wait("login"):
+                    await self.page.wait_for_url("**/dashboard**", timeout=self.wait_budgets['login'])
+                await self.save_session()
             
             print("Login Successful")
             
-            # 2. Go to Search 
-            # Often redirected to dashboard, so explicitly go to search or use nav
-            await self.page.goto("https://locumotive.co.uk/advance-search")
-
-            # 3. Wait for job cards
-            # We use the unique class 'bg-white.rounded-xl' which wraps each job in the list
-            try:
-                await self.page.wait_for_selector(".rounded-xl", timeout=15000)
-            except:
-                print("   No shifts found or page failed to load.")
-                return []
-            
-            # 4. Scrape the cards
-            # We select all divs that start with 'job_' in their class list
-            # This is specific to the Locumotive Angular app structure
-            job_cards = await self.page.locator("div[class*='job_']").all()
-            print(f"   Found {len(job_cards)} job cards")
+            # 2. Fetch the jobs over plain HTTP if the fast path is enabled
+            job_cards = await self.fetch_listing_http() or []
+
+            if not job_cards:
+                # Otherwise go to Search in the browser
+                # Often redirected to dashboard, so explicitly go to search or use nav
+                await self.goto(self.url("/advance-search"))
 
-            for card in job_cards:
+                # 3. Prefer the job list the Angular app fetched from its search API
+                if self.api_patterns:
+                    await self.wait_for_api_data()
+                    job_cards = [c for c in map(_card_from_api, self.api_records(API_FIELDS['date'])) if c]
+                    if job_cards and self.pagination.get('mode') == 'scroll':
+                        try:
+                            if await self.wait_for_rows("div[class*='job_']"):
+                                # Scrolling makes the app request the next pages, which are captured too
+                                await self.scroll_listing("div[class*='job_']")
+                        except ListingTimeout:
+                            # Only later pages are missing; the captured cards still stand
+                            print("   No job cards rendered to scroll; using the captured API data")
+                        job_cards = [c for c in map(_card_from_api, self.api_records(API_FIELDS['date'])) if c]
+                    if job_cards:
+                        print(f"   Found {len(job_cards)} jobs in captured API data")
+
+                if not job_cards:
+                    # Fallback: wait for job cards, or the page saying there are none
+                    # (a page that shows neither raises ListingTimeout and marks the run failed)
+                    if not await self.wait_for_rows("div[class*='job_']"):
+                        print("   No shifts listed.")
+                        return []
+                    await self.wait_for_stable("div[class*='job_']")
+                
+                    # 4. Scrape the cards, after scrolling the rest of the list in
+                    # We select all divs that start with 'job_' in their class list
+                    # This is specific to the Locumotive Angular app structure
+                    if self.pagination.get('mode') == 'scroll':
+                        await self.scroll_listing("div[class*='job_']")
+                    job_cards = await self.extract_all("div[class*='job_']", CARD_SCRIPT)
+                    print(f"   Found {len(job_cards)} job cards")
+
+            # Cards unchanged since the last complete run are already stored
+            for card in self.filter_listing(job_cards):
                 try:
-                    # Extracting data using the specific classes
-                    date_text = await card.locator(".locum-date").inner_text()
-                    time_text = await card.locator(".locum-time").inner_text()
-                    rate_text = await card.locator(".locum-price").inner_text()
-                    
-                    # City is in the h2 inside .address-area
-                    city_text = await card.locator(".address-area h2").last.inner_text()
+                    # Extracted using the specific classes; City is the last h2 inside .address-area
+                    date_text = card['date']
+                    time_text = card['time']
+                    rate_text = card['rate']
+                    city_text = card['city']
+
+                    # Cards missing any field are not real job cards
+                    if None in (date_text, time_text, rate_text, city_text):
+                        continue
                     
                     # Clean up the rate (e.g. " £325 /day " -> "325")
                     clean_rate = rate_text.replace("£", "").replace("/day", "").strip()
 
-                    # Since there is no postcode, we geocode the City
-                    lat, lon = await self.get_lat_lon(city_text)
+                    # Cards have no postcode, so the City gets geocoded unless the API gave one
+                    postcode = card.get('postcode') or ""
 
                     shift = {
                         "agency": "Locumotive",
+                        "shift_id": card.get('id') or "",
                         "company": "Locum Optometrist", # Blind until viewed
                         "location": city_text.strip(),
-                        "postcode": "", 
+                        "postcode": postcode, 
                         "date": date_text.strip(),
                         "time": time_text.strip(),
                         "rate": rate_text.strip(),
                         "total": clean_rate,
-                        "lat": lat,
-                        "lon": lon,
-                        "link": "https://locumotive.co.uk/advance-search"
+                        "lat": None, # Filled in by the geocoding stage
+                        "lon": None,
+                        "link": self.url("/advance-search")
                     }
                     
-                    self.shifts.append(shift)
+                    await self.add_shift(shift, row=card)
                     print(f"   + {shift['date']}: {shift['location']} (£{shift['total']})")
 
                 except Exception as e:
                     continue 
 
         except Exception as e:
+            self.failed = True
             print(f"Locumotive Error: {e}")
-            await self.page.screenshot(path="error_locumotive.png")
+            await self.error_screenshot("error_locumotive.png")
         
         finally:
             await self.close()
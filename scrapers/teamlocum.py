@@ -1,8 +1,39 @@
 import asyncio
 import re
-from .base import BaseScraper
+from .base import BaseScraper, parse_html, select_text
+
+# Reads every shift <li> in one evaluate call
+ROW_SCRIPT = """
+lis => lis.map(li => {
+    const h6 = li.querySelector('h6');
+    const info = li.querySelector('p.fw-semibold');
+    const badge = info ? info.querySelector('.badge') : null;
+    const link = info ? info.querySelector('a') : null;
+    return {
+        date: h6 ? h6.textContent : null,
+        time: badge ? badge.textContent : null,
+        location: link ? link.textContent : null,
+        info: info ? info.textContent : null
+    };
+})
+"""
 
 class TeamLocumScraper(BaseScraper):
+    BASE_URL = "https://app.teamlocum.co.uk"
+
+    def parse_listing(self, body, is_json):
+        # Same fields as ROW_SCRIPT, read from server-rendered HTML
+        rows = []
+        for li in parse_html(body).select("li:has(h6)"):
+            info = li.select_one("p.fw-semibold")
+            rows.append({
+                "date": select_text(li, "h6"),
+                "time": select_text(info, ".badge") if info is not None else None,
+                "location": select_text(info, "a") if info is not None else None,
+                "info": info.get_text() if info is not None else None
+            })
+        return rows
+
     async def run(self):
         print("Starting Team Locum...")
         await self.init_browser()
@@ -10,16 +41,18 @@ class TeamLocumScraper(BaseScraper):
         try:
             # 1. Login
             # Team Locum login usually redirects to a specific schedule/bookings ID
-            await self.page.goto("https://app.teamlocum.co.uk/login")
+            await self.goto(self.url("/login"))
             
             # Helper to check if we are on login page
             # We use a broad selector for input to be safe if 'username' vs 'email'
             if await self.page.is_visible("input[type='email']") or await self.page.is_visible("input[type='text']"):
+                self.session_expired()
                 user = self.secrets.get('TEAMLOCUM_USER') or ''
                 password = self.secrets.get('TEAMLOCUM_PASS') or ''
                 
                 if not user or not password:
                     print("   Warning: TEAMLOCUM_USER or TEAMLOCUM_PASS not set. Skipping.")
+                    self.failed = True
                     return []
                 
                 # Try generic input selectors if config ones aren't specific
@@ -30,49 +63,56 @@ class TeamLocumScraper(BaseScraper):
                 await self.page.click("button[type='submit']")
                 
                 print("   Logging in...")
-                await self.page.wait_for_load_state('networkidle')
+                await self.wait_for_login("input[type='password']")
+                await self.save_session()
 
             print("Login Successful")
 
-            # 2. Navigate to Bookings/Marketplace
-            # The URL might be dynamic: /<id>/bookings
-            # We assume the login redirects appropriately, or we might need to find the "Bookings" link
+            # 2. Fetch the bookings list over plain HTTP if the fast path is enabled
+            lis = await self.fetch_listing_http()
+
+            if lis is None:
+                # Otherwise navigate to Bookings/Marketplace in the browser
+                # The URL might be dynamic: /<id>/bookings
+                # We assume the login redirects appropriately, or we might need to find the "Bookings" link
             
-            # Check for "Bookings" or similar navigation if not immediately visible
-            # For now, we assume we land on a dashboard where shifts are listed or we can find the list
-            # Based on the HTML snippet, it looks like a list view.
+                # Check for "Bookings" or similar navigation if not immediately visible
+                # For now, we assume we land on a dashboard where shifts are listed or we can find the list
+                # Based on the HTML snippet, it looks like a list view.
             
-            # Wait for list items
-            try:
-                await self.page.wait_for_selector("li h6", timeout=15000)
-            except:
-                print("   No shifts found or page failed to load.")
-                return []
+                # Wait for list items, or the page saying there are none
+                # (neither in time raises ListingTimeout and marks the run failed)
+                if not await self.wait_for_rows("li:has(h6)"):
+                    print("   No shifts listed.")
+                    return []
+                await self.wait_for_stable("li:has(h6)")
 
-            # 3. Extract Cards
-            # The snippet shows shifts are <li> items containing an <h6> date
-            lis = await self.page.locator("li:has(h6)").all()
-            print(f"   Found {len(lis)} potential shifts")
+                # 3. Extract Cards
+                # The snippet shows shifts are <li> items containing an <h6> date
+                lis = await self.extract_all("li:has(h6)", ROW_SCRIPT)
+                print(f"   Found {len(lis)} potential shifts")
 
-            for li in lis:
+            # Rows unchanged since the last complete run are already stored
+            for li in self.filter_listing(lis):
                 try:
                     # Date: h6 tag
-                    date_text = await li.locator("h6").first.text_content()
+                    date_text = li['date']
                     
                     # The main info line is in a p.fw-semibold
-                    info_p = li.locator("p.fw-semibold").first
-                    
                     # Time: Badge inside the p
-                    time_text = await info_p.locator(".badge").first.text_content()
+                    time_text = li['time']
                     
                     # Location: Anchor text
-                    location_link = info_p.locator("a").first
-                    location_text = await location_link.text_content()
+                    location_text = li['location']
                     
                     # Rate: It's text in the p tag, outside the badge and link. 
                     # Structure: <badge>Time</badge> <a ..>Location</a>, £180 - DO
                     # We can get the full text and regex for the price
-                    full_text = await info_p.text_content()
+                    full_text = li['info']
+
+                    # Skip rows that might be "You have 0 activity" alerts or different structures
+                    if None in (date_text, time_text, location_text, full_text):
+                        continue
                     
                     # Regex to find price: £...
                     rate_match = re.search(r"£(\d+(\.\d{2})?)", full_text)
@@ -83,13 +123,11 @@ class TeamLocumScraper(BaseScraper):
                     # "BOL Franchise, Teddington" -> Teddington usually nice for geocoding
                     # But full string is safer for unique matching
                     clean_location = location_text.strip()
-                    
-                    # Geocode
-                    # Team Locum often lacks postcode in list view, so we rely on town name
-                    lat, lon = await self.get_lat_lon(clean_location)
+                    # Team Locum often lacks postcode in list view, so geocoding relies on town name
 
                     shift = {
                         "agency": "Team Locum",
+                        "shift_id": "", # Not exposed in the list view
                         "company": "Team Locum Client", # Generic unless we parse "BOL Franchise"
                         "location": clean_location,
                         "postcode": "", 
@@ -97,12 +135,12 @@ class TeamLocumScraper(BaseScraper):
                         "time": time_text.strip(),
                         "rate": rate_text,
                         "total": total_text,
-                        "lat": lat,
-                        "lon": lon,
-                        "link": "https://app.teamlocum.co.uk" # Dynamic links require IDs, safer to link root
+                        "lat": None, # Filled in by the geocoding stage
+                        "lon": None,
+                        "link": self.base_url # Dynamic links require IDs, safer to link root
                     }
                     
-                    self.shifts.append(shift)
+                    await self.add_shift(shift, row=li)
                     print(f"   + {shift['date']}: {shift['location']} (£{shift['total']})")
 
                 except Exception as e:
@@ -110,8 +148,9 @@ class TeamLocumScraper(BaseScraper):
                     continue
 
         except Exception as e:
+            self.failed = True
             print(f"Team Locum Error: {e}")
-            await self.page.screenshot(path="error_teamlocum.png")
+            await self.error_screenshot("error_teamlocum.png")
         
         finally:
             await self.close()
@@ -0,0 +1,53 @@
+import json
+import pytest
+from core.history import ShiftHistory
+from core.parsing import job_id_from_link
+from core.shift import ShiftParser
+from core.storage import SqliteShiftStore
+
+LEGACY_SHIFT = {
+    "agency": "LocateALocum",
+    "company": "Unknown Agency",
+    "location": "Derbyshire",
+    "postcode": "",
+    "date": "Thu 01 Jan 2026",
+    "time": "2:00 PM - 4:00 PM",
+    "rate": "£38.00/hr",
+    "total": "76.00",
+    "lat": 53.1185033,
+    "lon": -1.5566179,
+    "link": "https://locatealocum.com/login?returnUrl=/jobs/16371826",
+}
+
+def scraped(shift):
+    # The same shift as the LocateALocum scraper builds it today
+    link = "https://locatealocum.com/jobs/16371826"
+    raw = {k: v for k, v in shift.items() if k not in ("lat", "lon")}
+    raw.update(link=link, shift_id=job_id_from_link(link))
+    fresh = ShiftParser("LocateALocum", "hour").build(raw)
+    fresh.lat, fresh.lon = shift["lat"], shift["lon"]
+    return fresh
+
+STORES = {
+    "jsonl": lambda tmp, legacy: ShiftHistory(str(tmp / "history.jsonl"), legacy_path=legacy),
+    "sqlite": lambda tmp, legacy: SqliteShiftStore(str(tmp / "history.db"), import_from=(legacy,),
+                                                   export_path=str(tmp / "shifts.jsonl")),
+}
+
+@pytest.mark.parametrize("backend", STORES)
+def test_legacy_import_matches_a_fresh_scrape(tmp_path, backend):
+    legacy = tmp_path / "history.json"
+    legacy.write_text(json.dumps([LEGACY_SHIFT]), encoding="utf-8")
+
+    history = STORES[backend](tmp_path, str(legacy))
+    imported = history.all_shifts()
+    assert [r["shift_id"] for r in imported] == ["16371826"]
+
+    stats = history.merge("LocateALocum", [scraped(LEGACY_SHIFT)], now="2026-01-01T02:00:00Z")
+    assert stats["new"] == 0
+    assert stats["expired"] == 0
+    # Still the imported record, so its age is kept
+    [record] = history.all_shifts()
+    assert record["first_seen"] == imported[0]["first_seen"]
+    assert record["status"] == "active"
+    assert legacy.exists()
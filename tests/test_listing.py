@@ -0,0 +1,35 @@
+import asyncio
+import json
+from core.listing import ListingMemo, row_hash
+from core.pipeline import ShiftPipeline
+
+LOCUMBELL_ROW = {"id": 4412, "branch_name": "Specsavers", "city": "Buxton", "postcode": "SK17 6AA",
+                 "Shift Dates": "Thu 01 Jan 2026", "start_time": "09:00", "end_time": "17:30", "Rate": 300}
+
+def test_api_and_dom_rows_hash_alike():
+    # The DOM path reads the same row as the data-row-data attribute's JSON text
+    attribute = json.dumps(LOCUMBELL_ROW, indent=1)
+    assert row_hash(attribute) == row_hash(LOCUMBELL_ROW)
+    assert row_hash("not json") != row_hash(LOCUMBELL_ROW)
+
+class Store:
+    def touch(self, agency, ids, now):
+        return {"kept"}
+
+    def expire(self, agency, current_ids, now):
+        return 0
+
+    def commit(self):
+        pass
+
+def test_reused_rows_missing_from_the_store_are_forgotten(tmp_path):
+    memo = ListingMemo(str(tmp_path / "listings.json"))
+    memo.record("Paged", "abc", {"h1": "kept", "h2": "gone"})
+
+    async def main():
+        async with ShiftPipeline(Store(), geo=None, listing_memo=memo) as pipeline:
+            # A partial run leaves the memo as it was, except for the rows the store has lost
+            await pipeline.finish_agency("Paged", "error", reused={"kept", "gone"})
+
+    asyncio.run(main())
+    assert memo.rows("Paged") == {"h1": "kept"}
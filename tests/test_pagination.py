@@ -0,0 +1,75 @@
+import asyncio
+from core.pipeline import ShiftPipeline
+from core.runner import AgencyRunner
+from scrapers.base import BaseScraper
+
+def listing_page(n):
+    return [{"agency": "Paged", "location": f"Practice {n}-{i}", "date": "Thu 01 Jan 2026",
+             "time": "09:00 - 17:00", "rate": "£300", "link": f"/jobs/{n}{i}"} for i in range(3)]
+
+class PagedScraper(BaseScraper):
+    """
+    Three listing pages; `timeouts` are pages that show neither rows nor an empty-state message.
+    """
+    def __init__(self, timeouts=()):
+        super().__init__({"AGENCY_NAME": "Paged"}, browser_manager=object(), geo_service=object(),
+                         config={"pagination": {"mode": "url", "url_template": "/jobs?page={page}", "tabs": 3}})
+        self.timeouts = set(timeouts)
+
+    async def _load_tab(self, url, selector, script):
+        page = int(url.rsplit("=", 1)[1])
+        if page in self.timeouts:
+            return None
+        return listing_page(page) if page <= 3 else []
+
+    async def run(self):
+        rows = listing_page(1)
+        rows += await self._load_pages(self.pagination, 2, "li", "", rows[0])
+        for row in rows:
+            await self.add_shift(row)
+        return self.shifts
+
+class Geo:
+    async def fill_coordinates(self, shifts, report=False):
+        for shift in shifts:
+            shift.lat, shift.lon = 53.0, -2.0
+
+class Store:
+    def __init__(self):
+        self.stored, self.expired = [], []
+
+    def upsert(self, agency, records, now):
+        self.stored.extend(records)
+        return {"new": len(records), "changed": 0, "seen": 0}
+
+    def touch(self, agency, ids, now):
+        return set()
+
+    def expire(self, agency, current_ids, now):
+        self.expired.append(agency)
+        return 0
+
+    def commit(self):
+        pass
+
+def scrape(scraper):
+    store = Store()
+
+    async def main():
+        async with ShiftPipeline(store, Geo()) as pipeline:
+            return [r async for r in AgencyRunner().run([("paged", scraper, 30)], pipeline)]
+
+    return asyncio.run(main()), store
+
+def test_timed_out_middle_page_expires_nothing():
+    [result], store = scrape(PagedScraper(timeouts={2}))
+    assert result["status"] == "error"
+    assert store.expired == []
+    # Pages 1 and 3 still get stored
+    assert len(store.stored) == 6
+
+def test_complete_listing_stops_at_empty_page():
+    [result], store = scrape(PagedScraper())
+    assert result["status"] == "ok"
+    assert store.expired == ["Paged"]
+    assert len(store.stored) == 9